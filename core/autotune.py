@@ -0,0 +1,221 @@
+import contextlib
+import os
+import threading
+import time
+
+import psutil
+import torch
+
+from core.yolo_engine import base_model_for, map_device
+
+BATCH_CANDIDATES = (4, 8, 16, 32, 64, 128)
+PROBE_IMAGES = 512       # Images used from the training set for probing
+PROBE_BATCHES = 6        # Timed batches per candidate (after one warm-up batch)
+MIN_FREE_MEMORY = 0.15   # Fraction of memory that must stay free for a config to fit
+CACHE_MEMORY_BUDGET = 0.5  # Max fraction of available RAM the image cache may use
+CACHE_MIN_SPEEDUP = 1.1  # RAM cache must be at least this much faster to be picked
+
+
+def worker_candidates(cpu_count=None):
+    cpu_count = cpu_count or os.cpu_count() or 1
+    candidates = {0, 2, 4, 8, 16, 32, cpu_count // 2, cpu_count}
+    return sorted(w for w in candidates if w <= cpu_count)
+
+
+class _MemorySampler:
+    """Samples system memory use on a background thread and keeps the peak."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        mem = psutil.virtual_memory()
+        self.peak = max(self.peak, 1 - mem.available / mem.total)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def _memory_used_fraction(device, sampler=None):
+    if device.type == 'cuda':
+        total = torch.cuda.get_device_properties(device).total_memory
+        return torch.cuda.max_memory_reserved(device) / total
+    # Peak while the probe ran; the loader and its workers are gone by now
+    return sampler.peak if sampler else psutil.virtual_memory().percent / 100
+
+
+def _cycle(loader):
+    # Small probe subsets run out of batches within one epoch
+    while True:
+        yield from loader
+
+
+def _time_loader(loader, n_batches, step=None):
+    """Returns images/sec over n_batches after one warm-up batch."""
+    it = _cycle(loader)
+    batch = next(it)
+    if step:
+        step(batch)
+
+    images = 0
+    start = time.perf_counter()
+    for _ in range(n_batches):
+        batch = next(it)
+        if step:
+            step(batch)
+        images += batch['img'].shape[0]
+    return images / (time.perf_counter() - start)
+
+
+def autotune(config, log_callback=None):
+    """
+    Probes batch size, dataloader workers and image caching on the actual dataset
+    and picks the fastest configuration that fits in memory.
+
+    Args:
+        config (dict): Training config; must contain 'data_yaml'.
+        log_callback (func): Optional callback for logging.
+
+    Returns:
+        dict: 'batch', 'workers', 'cache' and the list of 'measurements'.
+    """
+    from ultralytics import YOLO
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data import build_dataloader, build_yolo_dataset
+    from ultralytics.data.utils import check_det_dataset
+    from ultralytics.utils.torch_utils import select_device
+
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+
+    imgsz = config.get('imgsz', 640)
+    ref_batch = config.get('batch', 16)
+    data = check_det_dataset(config['data_yaml'])
+    device = select_device(map_device(config.get('device', 'Auto')) or '', verbose=False)
+    measurements = []
+
+    cfg = get_cfg(overrides={
+        'imgsz': imgsz,
+        'degrees': config.get('degrees', 0.0),
+        'fliplr': config.get('fliplr', 0.5),
+        'mosaic': config.get('mosaic', 1.0),
+        'rect': config.get('rect', False),
+    })
+
+    def build_dataset(cache, fraction):
+        cfg.cache = cache
+        cfg.fraction = fraction
+        return build_yolo_dataset(cfg, data['train'], ref_batch, data, mode='train')
+
+    full_dataset = build_dataset(False, 1.0)
+    n_full = len(full_dataset)
+    # Probe on a subset; the full label scan above is cached by ultralytics
+    fraction = min(1.0, PROBE_IMAGES / n_full)
+    dataset = build_dataset(False, fraction) if fraction < 1.0 else full_dataset
+    del full_dataset
+    n_train = len(dataset)
+    log(f"Auto-tune: probing on {n_train} of {n_full} images at imgsz {imgsz}, device {device}")
+
+    # 1. Dataloader workers: pure data throughput at the reference batch size
+    best_workers, best_rate = 0, 0.0
+    # ultralytics' trainer forces workers=0 on CPU/MPS, so other values would never be used
+    candidates = worker_candidates() if device.type not in ('cpu', 'mps') else []
+    if not candidates:
+        log(f"  workers search skipped: ultralytics always trains with workers=0 on {device.type}")
+    for workers in candidates:
+        loader = build_dataloader(dataset, ref_batch, workers, shuffle=True)
+        rate = _time_loader(loader, PROBE_BATCHES)
+        del loader
+        measurements.append({'stage': 'workers', 'batch': ref_batch, 'workers': workers,
+                             'cache': False, 'images_per_sec': rate})
+        log(f"  workers={workers:<3} batch={ref_batch:<4} data loading: {rate:.1f} img/s")
+        if rate > best_rate * 1.05:
+            best_workers, best_rate = workers, rate
+
+    # 2. Batch size: full forward/backward step with the chosen workers
+    model = YOLO(base_model_for(config.get('version', 'YOLOv8'))).model
+    model.args = cfg
+    model.to(device).train()
+    for p in model.parameters():
+        p.requires_grad_(True)
+
+    def train_step(batch):
+        batch['img'] = batch['img'].to(device).float() / 255
+        for k in ('batch_idx', 'cls', 'bboxes'):
+            batch[k] = batch[k].to(device)
+        loss = model.loss(batch)[0]
+        loss.sum().backward()
+        model.zero_grad(set_to_none=True)
+
+    best_batch, best_rate = ref_batch, 0.0
+    for batch_size in BATCH_CANDIDATES:
+        if batch_size > n_train:
+            break
+        if device.type == 'cuda':
+            torch.cuda.reset_peak_memory_stats(device)
+        loader = build_dataloader(dataset, batch_size, best_workers, shuffle=True)
+        sampler = _MemorySampler() if device.type != 'cuda' else None
+        try:
+            with sampler or contextlib.nullcontext():
+                rate = _time_loader(loader, PROBE_BATCHES, step=train_step)
+        except RuntimeError as e:  # Out of memory
+            log(f"  batch={batch_size:<4} failed: {str(e).splitlines()[0]}")
+            break
+        finally:
+            del loader
+            if device.type == 'cuda':
+                torch.cuda.empty_cache()
+
+        used = _memory_used_fraction(device, sampler)
+        fits = used <= 1 - MIN_FREE_MEMORY
+        measurements.append({'stage': 'batch', 'batch': batch_size, 'workers': best_workers,
+                             'cache': False, 'images_per_sec': rate, 'memory_used': used, 'fits': fits})
+        log(f"  workers={best_workers:<3} batch={batch_size:<4} train step: {rate:.1f} img/s, "
+            f"memory used {used:.0%}{'' if fits else ' (too little headroom)'}")
+        if not fits:
+            break
+        if rate > best_rate:
+            best_batch, best_rate = batch_size, rate
+
+    # 3. RAM cache: only considered if the whole training set fits the memory budget
+    best_cache = False
+    needed = n_full * imgsz * imgsz * 3
+    available = psutil.virtual_memory().available
+    if needed <= available * CACHE_MEMORY_BUDGET:
+        base_loader = build_dataloader(dataset, best_batch, best_workers, shuffle=True)
+        base_rate = _time_loader(base_loader, PROBE_BATCHES)
+        del base_loader
+        cached_loader = build_dataloader(build_dataset('ram', fraction), best_batch, best_workers, shuffle=True)
+        cached_rate = _time_loader(cached_loader, PROBE_BATCHES)
+        del cached_loader
+        measurements.append({'stage': 'cache', 'batch': best_batch, 'workers': best_workers,
+                             'cache': 'ram', 'images_per_sec': cached_rate})
+        log(f"  cache=ram data loading: {cached_rate:.1f} img/s (no cache: {base_rate:.1f} img/s, "
+            f"needs ~{needed / 1e9:.1f} GB)")
+        best_cache = 'ram' if cached_rate >= base_rate * CACHE_MIN_SPEEDUP else False
+    else:
+        log(f"  cache=ram skipped: needs ~{needed / 1e9:.1f} GB, {available / 1e9:.1f} GB available")
+
+    log(f"Auto-tune result: batch={best_batch}, workers={best_workers}, cache={best_cache or 'off'}")
+    return {
+        'batch': best_batch,
+        'workers': best_workers,
+        'cache': best_cache,
+        'measurements': measurements,
+    }
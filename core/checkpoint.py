@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import yaml
+
+STATE_FILE = 'resume_state.json'
+
+# Config keys that define a run; changing any of them means the old checkpoint
+# belongs to a different experiment. Keys such as workers, device, cache or
+# patience may change between attempts without invalidating the run.
+FINGERPRINT_KEYS = (
+    'version', 'epochs', 'batch', 'imgsz', 'optimizer', 'lr0', 'cos_lr', 'rect',
+    'degrees', 'fliplr', 'mosaic',
+)
+
+
+def run_save_dir(project_name, model_name):
+    """Returns the directory ultralytics will train into for project/name."""
+    from ultralytics.cfg import get_cfg, get_save_dir
+
+    args = get_cfg(overrides={
+        'project': project_name,
+        'name': model_name,
+        'exist_ok': True,
+        'task': 'detect',
+        'mode': 'train',
+    })
+    return Path(get_save_dir(args))
+
+
+def _folder_signature(folder):
+    """Cheap signature of an image folder: file count, total size and latest mtime."""
+    count, size, mtime = 0, 0, 0.0
+    for root, _, files in os.walk(folder):
+        for f in files:
+            try:
+                st = os.stat(os.path.join(root, f))
+            except OSError:
+                continue
+            count += 1
+            size += st.st_size
+            mtime = max(mtime, st.st_mtime)
+    return [count, size, mtime]
+
+
+def dataset_signature(data_yaml):
+    """Signature of the dataset referenced by a data.yaml (paths, classes and file stats)."""
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+
+    signature = {'names': data.get('names')}
+    for split in ('train', 'val'):
+        path = data.get(split)
+        if not path:
+            continue
+        signature[split] = {'path': path}
+        if os.path.isdir(path):
+            signature[split]['files'] = _folder_signature(path)
+    return signature
+
+
+def training_fingerprint(config):
+    """
+    Hash identifying a training run by its config and dataset.
+
+    Args:
+        config (dict): Training config; must contain 'data_yaml'.
+    """
+    payload = {k: config.get(k) for k in FINGERPRINT_KEYS}
+    if config.get('stage'):
+        payload['stage'] = config['stage'] # Stage of a multi-stage schedule (index, fraction, start weights)
+    payload['dataset'] = dataset_signature(config['data_yaml'])
+    data = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha1(data).hexdigest()
+
+
+def read_state(save_dir):
+    path = Path(save_dir) / STATE_FILE
+    if not path.exists():
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_state(save_dir, fingerprint, completed=False):
+    """Records which config a run directory belongs to and whether it finished."""
+    save_dir = Path(save_dir)
+    save_dir.mkdir(parents=True, exist_ok=True)
+    with open(save_dir / STATE_FILE, 'w') as f:
+        json.dump({'fingerprint': fingerprint, 'completed': completed}, f)
+
+
+def discard_checkpoint(save_dir):
+    """
+    Removes last.pt of a previous run before starting a fresh one in save_dir.
+
+    The new run state is written before training, but the old last.pt would stay
+    until the first epoch ends; if the new run died before that, its state would
+    vouch for the old checkpoint.
+
+    Returns:
+        bool: True if a checkpoint was removed.
+    """
+    last = Path(save_dir) / 'weights' / 'last.pt'
+    if not last.exists():
+        return False
+    last.unlink()
+    return True
+
+
+def find_resume_checkpoint(save_dir, fingerprint):
+    """
+    Looks for an interrupted run in save_dir that can be resumed.
+
+    Returns:
+        tuple: (path to last.pt or None, human readable reason).
+    """
+    last = Path(save_dir) / 'weights' / 'last.pt'
+    if not last.exists():
+        return None, "No previous checkpoint found."
+
+    state = read_state(save_dir)
+    if state is None:
+        return None, f"{last} has no run state, cannot verify it belongs to this config."
+    if state.get('fingerprint') != fingerprint:
+        return None, f"{last} was trained with a different config or dataset, not resuming."
+    if state.get('completed'):
+        return None, "Previous run already finished."
+
+    import torch
+    ckpt = torch.load(last, map_location='cpu', weights_only=False)
+    epoch = ckpt.get('epoch', -1)
+    if epoch < 0 or ckpt.get('optimizer') is None:
+        return None, f"{last} has no optimizer state, nothing to resume."
+
+    return last, f"Resuming from {last} after epoch {epoch + 1}."
@@ -33,11 +33,17 @@ def create_data_yaml(train_path, val_path, class_names_str, output_path="data.ya
     
     return os.path.abspath(output_path)
 
+import hashlib
+import json
 import shutil
 import random
+import time
 from pathlib import Path
+from core import profiling
+from core.discovery import IMAGE_EXTENSIONS, iter_images
 
-def split_dataset(source_folder, output_folder, split_ratio=0.8, progress_callback=None):
+def split_dataset(source_folder, output_folder, split_ratio=0.8, progress_callback=None,
+                  dedup_threshold=None, dedup_mode='group', recursive=False, include=None, exclude=None):
     """
     Splits a raw dataset into YOLO train/val structure.
     
@@ -46,6 +52,14 @@ def split_dataset(source_folder, output_folder, split_ratio=0.8, progress_callba
         output_folder (str): Destination folder.
         split_ratio (float): Ratio of training set (0.0 to 1.0).
         progress_callback (func): Optional callback for logging.
+        dedup_threshold (int): Max Hamming distance between perceptual hashes for two
+            images to count as near-duplicates. None disables deduplication.
+        dedup_mode (str): 'group' keeps each duplicate cluster on one side of the split,
+            'drop' keeps only one image per cluster.
+        recursive (bool): Include images in subfolders; the subfolder structure is
+            mirrored under images/<split>/ and labels/<split>/.
+        include (list): Optional glob patterns images must match.
+        exclude (list): Optional glob patterns of images and folders to skip.
     """
     source = Path(source_folder)
     dest = Path(output_folder)
@@ -59,40 +73,64 @@ def split_dataset(source_folder, output_folder, split_ratio=0.8, progress_callba
     (dest / 'labels' / 'train').mkdir(parents=True, exist_ok=True)
     (dest / 'labels' / 'val').mkdir(parents=True, exist_ok=True)
 
-    # Get all images
-    valid_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
-    images = [f for f in source.iterdir() if f.suffix.lower() in valid_exts]
+    # Get all images, keeping paths relative to the source folder
+    with profiling.span("discovery"):
+        rel_paths = {
+            Path(path): rel_path
+            for path, rel_path in iter_images(source, IMAGE_EXTENSIONS, recursive=recursive,
+                                              include=include, exclude=exclude,
+                                              workers=8 if recursive else None)
+        }
+    images = sorted(rel_paths, key=rel_paths.get)
     
     if not images:
         if progress_callback:
             progress_callback("No images found in source folder.")
         return
 
-    # Shuffle
-    random.shuffle(images)
-    
-    split_idx = int(len(images) * split_ratio)
-    train_imgs = images[:split_idx]
-    val_imgs = images[split_idx:]
+    if dedup_threshold is not None:
+        with profiling.span("dedup", images=len(images)):
+            clusters = find_duplicate_clusters(images, dedup_threshold, dedup_mode, progress_callback)
+    else:
+        clusters = [[img] for img in images]
+
+    # Shuffle whole clusters so near-duplicates never straddle the split
+    random.shuffle(clusters)
+    n_images = sum(len(c) for c in clusters)
+    split_idx = int(n_images * split_ratio)
+
+    train_imgs, val_imgs = [], []
+    for cluster in clusters:
+        if len(train_imgs) < split_idx:
+            train_imgs.extend(cluster)
+        else:
+            val_imgs.extend(cluster)
+    images = train_imgs + val_imgs
     
     if progress_callback:
         progress_callback(f"Found {len(images)} images. Split: {len(train_imgs)} Train, {len(val_imgs)} Val.")
 
     def copy_files(file_list, split_type):
         for img_path in file_list:
+            rel_path = Path(rel_paths[img_path])
+            if rel_path.parent != Path('.'):
+                (dest / 'images' / split_type / rel_path.parent).mkdir(parents=True, exist_ok=True)
+                (dest / 'labels' / split_type / rel_path.parent).mkdir(parents=True, exist_ok=True)
+
             # Copy image
-            shutil.copy2(img_path, dest / 'images' / split_type / img_path.name)
+            shutil.copy2(img_path, dest / 'images' / split_type / rel_path)
             
             # Copy label if exists
             label_path = img_path.with_suffix('.txt')
             if label_path.exists():
-                shutil.copy2(label_path, dest / 'labels' / split_type / label_path.name)
+                shutil.copy2(label_path, dest / 'labels' / split_type / rel_path.with_suffix('.txt'))
             
             # Check for classes.txt (copy once if found, but usually it's one per dataset)
             # We will handle classes.txt separately
             
-    copy_files(train_imgs, 'train')
-    copy_files(val_imgs, 'val')
+    with profiling.span("copy", images=len(images)):
+        copy_files(train_imgs, 'train')
+        copy_files(val_imgs, 'val')
     
     # Handle classes.txt
     classes_file = source / 'classes.txt'
@@ -103,3 +141,199 @@ def split_dataset(source_folder, output_folder, split_ratio=0.8, progress_callba
 
     if progress_callback:
         progress_callback(f"Dataset preparation complete at {dest}")
+
+def find_duplicate_clusters(images, threshold, mode='group', progress_callback=None):
+    """
+    Groups near-duplicate images by perceptual hash.
+
+    Args:
+        images (list): Image paths.
+        threshold (int): Max Hamming distance between hashes of near-duplicates.
+        mode (str): 'group' returns every cluster in full, 'drop' keeps one image per cluster.
+
+    Returns:
+        list: Clusters (lists of image paths).
+    """
+    from core.dedup import compute_hashes, find_clusters
+
+    hashes, valid = compute_hashes(images, progress_callback=progress_callback)
+    labels = find_clusters(hashes[valid], threshold)
+
+    clusters = {}
+    valid_images = [img for img, ok in zip(images, valid) if ok]
+    for img, label in zip(valid_images, labels):
+        clusters.setdefault(label, []).append(img)
+    # Unreadable images cannot be hashed; keep them as singletons
+    result = list(clusters.values()) + [[img] for img, ok in zip(images, valid) if not ok]
+
+    duplicates = sum(len(c) - 1 for c in result)
+    if progress_callback:
+        progress_callback(
+            f"Near-duplicate check: {duplicates} duplicates in {sum(len(c) > 1 for c in result)} clusters."
+        )
+
+    if mode == 'drop':
+        # Keep the largest file of each cluster (usually the best quality shot)
+        result = [[max(c, key=lambda p: p.stat().st_size)] for c in result]
+        if progress_callback:
+            progress_callback(f"Dropped {duplicates} near-duplicate images.")
+    return result
+
+PREPARED_ROOT = os.path.join("runs", "datasets")
+
+def _list_split(folder):
+    """Sorted image list of one split, in the same order ultralytics reads a folder."""
+    from ultralytics.data.utils import IMG_FORMATS
+
+    extensions = tuple(f".{ext}" for ext in IMG_FORMATS)
+    # ultralytics globs the folder, which skips hidden files (e.g. macOS "._" files)
+    return sorted(
+        os.path.abspath(path) for path, rel_path in iter_images(folder, extensions, recursive=True)
+        if not os.path.basename(path).startswith('.')
+    )
+
+def _label_cache_hash(im_files, nc):
+    """Hash ultralytics stores in a detection label cache (YOLODataset.get_cache_hash)."""
+    from ultralytics.data.utils import get_hash, img2label_paths
+
+    scan_args = (False, nc, None, False) # use_keypoints, nc, kpt_shape, single_cls
+    return get_hash(img2label_paths(im_files) + im_files + [str(scan_args)])
+
+def _read_cache_hash(path):
+    from ultralytics.data.utils import load_dataset_cache_file
+
+    try:
+        return load_dataset_cache_file(path).get('hash')
+    except Exception: # Missing or unreadable
+        return None
+
+def _copy_atomic(src, dst):
+    tmp = Path(f"{dst}.{os.getpid()}.tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+def prepare_dataset(train_path, val_path, class_names_str, cache_root=PREPARED_ROOT, log_callback=None):
+    """
+    Prepares a dataset for training and caches the result per dataset version.
+
+    The train/val folders are listed once into sorted file lists under
+    cache_root/<key>/, where key hashes the class names and the path, size and
+    mtime of every image and label file. ultralytics keeps its label cache next to
+    the labels folder, where runs on a subset (autotune, staged training) or on
+    other class lists overwrite it; a copy is kept with the prepared dataset and
+    put back before training, so an unchanged dataset is never rescanned.
+
+    Args:
+        train_path (str): Folder of training images.
+        val_path (str): Folder of validation images (train_path if empty).
+        class_names_str (str): Comma separated class names.
+        cache_root (str): Folder holding prepared datasets.
+        log_callback (func): Optional callback for logging.
+
+    Returns:
+        str: Path of the prepared data.yaml, which references the file lists.
+    """
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+
+    classes = [c.strip() for c in class_names_str.split(',') if c.strip()]
+    splits = {'train': train_path, 'val': val_path or train_path}
+
+    with profiling.span("discovery"):
+        files, hashes = {}, {}
+        for split, folder in splits.items():
+            files[split] = _list_split(folder)
+            if not files[split]:
+                raise FileNotFoundError(f"No images found in {folder}")
+            hashes[split] = _label_cache_hash(files[split], len(classes))
+
+    key = hashlib.sha1(json.dumps({'names': classes, 'splits': hashes}, sort_keys=True).encode()).hexdigest()[:16]
+    prepared = Path(cache_root) / key
+    data_yaml = prepared / 'data.yaml'
+
+    if data_yaml.exists():
+        log(f"Dataset unchanged, reusing prepared dataset {prepared}")
+    else:
+        prepared.mkdir(parents=True, exist_ok=True)
+        for split, im_files in files.items():
+            tmp = prepared / f"{split}.txt.{os.getpid()}.tmp"
+            tmp.write_text('\n'.join(im_files) + '\n', encoding='utf-8')
+            os.replace(tmp, prepared / f"{split}.txt")
+        manifest = {
+            'names': classes,
+            'splits': {split: {'folder': os.path.abspath(folder), 'images': len(files[split]),
+                               'hash': hashes[split]} for split, folder in splits.items()},
+            'created': time.time(),
+        }
+        (prepared / 'manifest.json').write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        # data.yaml is written last and marks the prepared dataset as complete
+        tmp = create_data_yaml(prepared / 'train.txt', prepared / 'val.txt', class_names_str,
+                               str(prepared / f"data.yaml.{os.getpid()}.tmp"))
+        os.replace(tmp, data_yaml)
+        log(f"Prepared dataset {prepared} ({len(files['train'])} train, {len(files['val'])} val images)")
+
+    for split, im_files in files.items():
+        _restore_label_cache(prepared, split, im_files, hashes[split], log)
+    return str(data_yaml)
+
+def _label_cache_path(im_files):
+    """Where ultralytics keeps the label cache of a split (YOLODataset.get_labels)."""
+    from ultralytics.data.utils import img2label_paths
+
+    return Path(img2label_paths(im_files[:1])[0]).parent.with_suffix('.cache')
+
+def _restore_label_cache(prepared, split, im_files, expected_hash, log):
+    target = _label_cache_path(im_files)
+    stored = prepared / f"{split}.cache"
+    try:
+        if _read_cache_hash(target) == expected_hash:
+            if not stored.exists():
+                _copy_atomic(target, stored)
+        elif stored.exists():
+            _copy_atomic(stored, target)
+            log(f"Restored {split} label cache {target}")
+    except OSError as e:
+        log(f"Could not restore {split} label cache: {e}") # ultralytics scans the labels instead
+
+def _prepared_dir(data_yaml):
+    """Prepared dataset folder a data.yaml (or a run's copy of it) refers to, or None."""
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f) or {}
+    prepared = Path(data.get('path') or Path(data_yaml).parent)
+    return prepared if (prepared / 'manifest.json').exists() else None
+
+def restore_label_caches(data_yaml, log_callback=None):
+    """
+    Puts the label caches of a prepared dataset back next to its labels (and keeps
+    valid ones that are not stored yet). Training on a subset overwrites them, so
+    call this before training again on the same data. Does nothing for a data.yaml
+    that prepare_dataset did not create.
+    """
+    prepared = _prepared_dir(data_yaml)
+    if prepared is None:
+        return
+    with open(prepared / 'manifest.json', encoding='utf-8') as f:
+        manifest = json.load(f)
+    for split, info in manifest['splits'].items():
+        im_files = (prepared / f"{split}.txt").read_text(encoding='utf-8').splitlines()
+        _restore_label_cache(prepared, split, im_files, info['hash'], log_callback or (lambda msg: None))
+
+def store_label_caches(data_yaml):
+    """
+    Keeps the label caches ultralytics wrote while training on a prepared dataset,
+    so the next run can skip the label scan. Call after training.
+    """
+    prepared = _prepared_dir(data_yaml)
+    if prepared is None:
+        return
+    with open(prepared / 'manifest.json', encoding='utf-8') as f:
+        manifest = json.load(f)
+    for split, info in manifest['splits'].items():
+        stored = prepared / f"{split}.cache"
+        if stored.exists():
+            continue
+        im_files = (prepared / f"{split}.txt").read_text(encoding='utf-8').splitlines()
+        target = _label_cache_path(im_files)
+        if _read_cache_hash(target) == info['hash']:
+            _copy_atomic(target, stored)
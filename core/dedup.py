@@ -0,0 +1,220 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Above this many images the O(n^2) scan is replaced by a band index
+BRUTE_FORCE_LIMIT = 20000
+BLOCK_SIZE = 256
+# Bands up to this width use a dense bucket table instead of binary search
+DENSE_BAND_BITS = 24
+# Bit flips probed per band; wider radii need too many flip patterns
+MAX_BAND_RADIUS = 2
+# Candidate pairs expanded at once by the band index
+MAX_CANDIDATES = 1 << 22
+# Largest threshold the band index handles in reasonable time on ~1M images
+MAX_THRESHOLD = 8
+
+# Popcount lookup table for NumPy versions without np.bitwise_count
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def dhash(image_path, hash_size=8):
+    """
+    64-bit difference hash of an image (None if it cannot be read).
+    JPEGs are decoded at reduced resolution since only a tiny thumbnail is needed.
+    """
+    import cv2
+
+    img = cv2.imread(str(image_path), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if img is None:
+        return None
+    small = cv2.resize(img, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def compute_hashes(paths, workers=None, progress_callback=None):
+    """
+    Hashes images in parallel (OpenCV releases the GIL while decoding).
+
+    Returns:
+        tuple: (hashes as np.uint64 array, boolean mask of readable images).
+    """
+    workers = workers or min(32, (os.cpu_count() or 1) * 2)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        values = list(pool.map(dhash, paths, chunksize=64))
+
+    valid = np.array([v is not None for v in values], dtype=bool)
+    hashes = np.array([v if v is not None else 0 for v in values], dtype=np.uint64)
+    if progress_callback:
+        progress_callback(f"Computed perceptual hashes for {int(valid.sum())} images.")
+    return hashes, valid
+
+
+def _popcount(x):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(*x.shape, 8).sum(-1)
+
+
+def _pairs_brute_force(hashes, threshold):
+    """Yields (i, j) index arrays of the pairs within threshold, one block of rows at a time."""
+    n = len(hashes)
+    for start in range(0, n, BLOCK_SIZE):
+        block = hashes[start:start + BLOCK_SIZE]
+        dist = _popcount(block[:, None] ^ hashes[None, start:])
+        i, j = np.nonzero(dist <= threshold)
+        keep = j > i  # Upper triangle only (j is relative to start)
+        yield i[keep] + start, j[keep] + start
+
+
+def _flip_masks(bits, radius):
+    """All masks over `bits` bits with at most `radius` bits set."""
+    from itertools import combinations
+
+    masks = [0]
+    for r in range(1, radius + 1):
+        masks += [sum(1 << b for b in combo) for combo in combinations(range(bits), r)]
+    return np.array(masks, dtype=np.uint64)
+
+
+def _band_layout(n, threshold):
+    """
+    Picks the number of bands and the search radius per band for the band index.
+
+    Two hashes within threshold are within radius on at least one of n_bands bands
+    when n_bands * (radius + 1) > threshold. Narrow bands need few flip patterns but
+    give crowded buckets; wide bands the reverse. The layout with the lowest
+    estimated work (lookups plus candidate checks) is used.
+    """
+    from math import comb
+
+    best = None
+    for radius in range(MAX_BAND_RADIUS + 1):
+        n_bands = threshold // (radius + 1) + 1
+        if n_bands > 64:
+            continue
+        bits = 64 // n_bands
+        masks = sum(comb(bits, r) for r in range(radius + 1))
+        cost = n_bands * masks * (2 + n / 2.0 ** bits)
+        if best is None or cost < best[0]:
+            best = (cost, n_bands, radius)
+    return best[1], best[2]
+
+
+def _pairs_band_index(hashes, threshold):
+    """
+    Yields (i, j) index arrays of the pairs within threshold using multi-index
+    hashing: the 64 bits are split into bands (see _band_layout), each band is
+    bucketed once and probed with every bit-flip pattern of the band radius, so
+    only near neighbours are compared. Candidates are expanded and verified in
+    chunks of at most MAX_CANDIDATES, and a pair may be yielded more than once.
+    """
+    n = len(hashes)
+    n_bands, radius = _band_layout(n, threshold)
+    bounds = np.linspace(0, 64, n_bands + 1).astype(int)
+
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        bits = int(hi - lo)
+        band = (hashes >> np.uint64(lo)) & np.uint64((1 << bits) - 1)
+        order = np.argsort(band, kind='stable')
+        sorted_band = band[order]
+        if bits <= DENSE_BAND_BITS:
+            # Direct bucket table: O(1) lookups instead of binary searches
+            bucket_counts = np.bincount(band.astype(np.int64), minlength=1 << bits)
+            bucket_starts = np.cumsum(bucket_counts) - bucket_counts
+        for mask in _flip_masks(bits, radius):
+            query = band ^ mask
+            if bits <= DENSE_BAND_BITS:
+                query = query.astype(np.int64)
+                left = bucket_starts[query]
+                counts = bucket_counts[query]
+            else:
+                left = np.searchsorted(sorted_band, query, side='left')
+                counts = np.searchsorted(sorted_band, query, side='right') - left
+            hit = np.flatnonzero(counts)
+            if hit.size == 0:
+                continue
+            # Split the queries so each chunk expands to about MAX_CANDIDATES pairs
+            total = np.cumsum(counts[hit])
+            cuts = np.searchsorted(total, np.arange(MAX_CANDIDATES, total[-1], MAX_CANDIDATES), side='right')
+            for chunk in np.split(hit, np.unique(cuts)):
+                if chunk.size == 0:
+                    continue
+                # Expand every (query, match) combination
+                reps = counts[chunk]
+                i = np.repeat(chunk, reps)
+                offsets = np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps)
+                j = order[np.repeat(left[chunk], reps) + offsets]
+                # Verify full distance right away so only true pairs are kept
+                keep = (i < j) & (_popcount(hashes[i] ^ hashes[j]) <= threshold)
+                yield i[keep], j[keep]
+
+
+def _iter_pairs(hashes, threshold):
+    if len(hashes) <= BRUTE_FORCE_LIMIT:
+        return _pairs_brute_force(hashes, threshold)
+    if threshold > MAX_THRESHOLD:
+        raise ValueError(f"Near-duplicate threshold {threshold} is too loose for {len(hashes)} images "
+                         f"(max {MAX_THRESHOLD})")
+    return _pairs_band_index(hashes, threshold)
+
+
+def find_duplicate_pairs(hashes, threshold):
+    """Returns the (K, 2) unique index pairs whose Hamming distance is <= threshold."""
+    n = len(hashes)
+    # Pairs are encoded as i * n + j so repeats are removed with a 1-D unique
+    encoded = [i.astype(np.int64) * n + j for i, j in _iter_pairs(hashes, threshold)]
+    if not encoded:
+        return np.zeros((0, 2), dtype=np.int64)
+    encoded = np.unique(np.concatenate(encoded))
+    return np.stack([encoded // n, encoded % n], axis=1)
+
+
+def _union(parent, a, b):
+    """
+    Merges the components of every edge (a[k], b[k]) in a union-find parent array.
+    Roots always point to a smaller index, so the larger root is attached to the smaller.
+    """
+    while a.size:
+        ra, rb = _roots(parent, a), _roots(parent, b)
+        diff = ra != rb
+        if not diff.any():
+            return
+        a, b = ra[diff], rb[diff]
+        np.minimum.at(parent, np.maximum(a, b), np.minimum(a, b))
+
+
+def _roots(parent, x):
+    while True:
+        p = parent[x]
+        if np.array_equal(p, x):
+            return x
+        x = p
+
+
+def find_clusters(hashes, threshold):
+    """
+    Groups near-duplicate images.
+
+    Identical hashes are merged up front, then the pairs between distinct hashes
+    are merged block by block into a union-find array, so a huge cluster (e.g. a
+    static camera) never materializes all of its pairs at once.
+
+    Returns:
+        np.ndarray: Cluster id per image; images without duplicates get their own id.
+    """
+    unique, inverse = np.unique(hashes, return_inverse=True)
+    parent = np.arange(len(unique))
+    for i, j in _iter_pairs(unique, threshold):
+        _union(parent, i, j)
+        parent = parent[parent] # Halve root chains so later lookups stay short
+
+    # Point every entry straight at its root
+    while True:
+        flat = parent[parent]
+        if np.array_equal(flat, parent):
+            break
+        parent = flat
+    return parent[inverse.ravel()]
@@ -0,0 +1,133 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+_DONE = object()
+
+
+def _matches(rel_path, name, patterns):
+    return any(fnmatch(rel_path, p) or fnmatch(name, p) for p in patterns)
+
+
+def _scan(root, rel_dir, extensions, recursive, include, exclude):
+    """
+    Lists one directory with os.scandir, yielding (abs_path, rel_path, is_dir) for
+    matching images and, when recursive, for subfolders that are not excluded.
+    Relative paths use '/' separators on every platform.
+    """
+    try:
+        it = os.scandir(os.path.join(root, rel_dir) if rel_dir else root)
+    except OSError:
+        return # Unreadable or vanished directory
+    with it:
+        for entry in it:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if recursive and not (exclude and _matches(rel_path, entry.name, exclude)):
+                    yield entry.path, rel_path, True
+                continue
+            if extensions and os.path.splitext(entry.name)[1].lower() not in extensions:
+                continue
+            if include and not _matches(rel_path, entry.name, include):
+                continue
+            if exclude and _matches(rel_path, entry.name, exclude):
+                continue
+            yield entry.path, rel_path, False
+
+
+def _walk(root, extensions, recursive, include, exclude):
+    """Lazily walks the tree on the calling thread, yielding (abs_path, rel_path)."""
+    stack = ['']
+    while stack:
+        for path, rel_path, is_dir in _scan(root, stack.pop(), extensions, recursive, include, exclude):
+            if is_dir:
+                stack.append(rel_path)
+            else:
+                yield path, rel_path
+
+
+def iter_images(root, extensions=IMAGE_EXTENSIONS, recursive=False, include=None, exclude=None,
+                workers=None):
+    """
+    Streams image files under root as (abs_path, rel_path) tuples, so consumers can
+    start before the whole tree has been listed.
+
+    Args:
+        root (str): Root folder.
+        extensions (tuple): Lower-case file extensions to keep (None keeps all files).
+        recursive (bool): Descend into subfolders.
+        include (list): Optional glob patterns; a file must match one of them
+            (matched against the relative path and the file name).
+        exclude (list): Optional glob patterns for files and folders to skip.
+        workers (int): List folders in parallel with this many threads (useful on
+            network storage). Every folder, at any depth, is a separate work item,
+            so deep trees with a single top-level folder are parallel as well.
+            Output order is then not stable.
+    """
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Folder not found: {root}")
+    extensions = tuple(e.lower() for e in extensions) if extensions else None
+
+    if not recursive or not workers or workers <= 1:
+        yield from _walk(root, extensions, recursive, include, exclude)
+        return
+
+    # Each pool task lists one folder, streams its files into a bounded queue and
+    # submits its subfolders as new tasks; the last task to finish signals the end
+    results = queue.Queue(maxsize=4096)
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    lock = threading.Lock()
+    outstanding = [0]
+
+    def put(item):
+        # Gives up once the consumer has stopped reading
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def submit(rel_dir):
+        with lock:
+            outstanding[0] += 1
+        pool.submit(scan_dir, rel_dir)
+
+    def scan_dir(rel_dir):
+        try:
+            for path, rel_path, is_dir in _scan(root, rel_dir, extensions, True, include, exclude):
+                if stop.is_set():
+                    return
+                if is_dir:
+                    submit(rel_path)
+                elif not put((path, rel_path)):
+                    return
+        except RuntimeError:
+            return # Pool shut down because the consumer stopped
+        finally:
+            with lock:
+                outstanding[0] -= 1
+                finished = outstanding[0] == 0
+            if finished:
+                put(_DONE)
+
+    try:
+        submit('')
+        while True:
+            item = results.get()
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,257 @@
+"""
+Multi-process CPU training on one host.
+
+The parent launches one `python -m core.distributed` process per rank. Each rank is
+pinned to its own block of cores, joins a gloo process group and trains with
+DistributedDataParallel on a DistributedSampler shard of the dataset, so
+gradients are averaged across ranks every step. Ranks report progress as marked
+JSON lines on stdout, which the parent aggregates.
+
+Rank environment variables must be set before ultralytics is imported (it reads
+RANK/WORLD_SIZE at import time), so this module only imports it inside the rank.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+MESSAGE_PREFIX = '@@yolo-dist '
+REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cores(cores, world_size):
+    """Splits cores into world_size contiguous, nearly equal blocks."""
+    base, extra = divmod(len(cores), world_size)
+    blocks, start = [], 0
+    for rank in range(world_size):
+        size = base + (rank < extra)
+        blocks.append(cores[start:start + size])
+        start += size
+    return blocks
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def train_distributed(model, train_args, world_size, save_dir, progress_callback=None, log_callback=None):
+    """
+    Trains with world_size CPU processes and waits for them to finish.
+
+    Args:
+        model (str): Weights to start from (base model or resume checkpoint).
+        train_args (dict): Keyword arguments for ultralytics' trainer (data, epochs, batch, ...).
+            The batch size is the global batch; every rank gets batch // world_size.
+        world_size (int): Number of training processes.
+        save_dir (Path): Run directory; the rank config is written there.
+        progress_callback (func): Optional callback receiving overall percent done.
+        log_callback (func): Optional callback for logging.
+
+    Returns:
+        str: save_dir reported by rank 0.
+    """
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+
+    cores = available_cores()
+    if world_size > len(cores):
+        log(f"Only {len(cores)} CPU core(s) available, reducing training processes from {world_size}")
+    world_size = max(1, min(world_size, len(cores)))
+    if train_args.get('batch', 16) < world_size:
+        raise ValueError(f"Batch size {train_args.get('batch')} is smaller than the process count {world_size}")
+    blocks = split_cores(cores, world_size)
+
+    Path(save_dir).mkdir(parents=True, exist_ok=True)
+    config_path = Path(save_dir) / 'distributed_args.json'
+    with open(config_path, 'w') as f:
+        json.dump({'model': str(model), 'train_args': train_args}, f)
+
+    port = _free_port()
+    log(f"Starting {world_size} CPU training processes ({len(blocks[0])}-{len(blocks[-1])} cores each, gloo backend)")
+
+    processes = []
+    for rank, block in enumerate(blocks):
+        env = dict(os.environ)
+        env.update({
+            'RANK': str(rank),
+            'LOCAL_RANK': str(rank),
+            'WORLD_SIZE': str(world_size),
+            'MASTER_ADDR': '127.0.0.1',
+            'MASTER_PORT': str(port),
+            'OMP_NUM_THREADS': str(len(block)),
+            'MKL_NUM_THREADS': str(len(block)),
+            'PYTHONPATH': os.pathsep.join(filter(None, [REPO_ROOT, env.get('PYTHONPATH')])),
+        })
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'core.distributed', str(config_path), ','.join(map(str, block))],
+            env=env, stdout=subprocess.PIPE, text=True, bufsize=1,
+        ))
+
+    # Per-rank fraction of the run completed; overall progress follows the slowest rank
+    fractions = [0.0] * world_size
+    result = {}
+    lock = threading.Lock()
+    last_percent = [-1]
+
+    def read_output(rank, proc):
+        for line in proc.stdout:
+            # Progress bars write to the same stream without newlines, so a message
+            # may follow other output on the same line
+            start = line.find(MESSAGE_PREFIX)
+            if start != 0 and rank == 0:
+                sys.stdout.write(line if start < 0 else line[:start] + '\n') # Keep ultralytics' console output
+            if start < 0:
+                continue
+            msg = json.loads(line[start + len(MESSAGE_PREFIX):])
+            with lock:
+                if msg['type'] == 'progress':
+                    fractions[rank] = msg['fraction']
+                    percent = int(min(fractions) * 100)
+                    if progress_callback and percent != last_percent[0]:
+                        last_percent[0] = percent
+                        progress_callback(percent)
+                elif msg['type'] == 'log':
+                    log(msg['message'])
+                elif msg['type'] == 'done':
+                    result['save_dir'] = msg['save_dir']
+
+    readers = [threading.Thread(target=read_output, args=(rank, p), daemon=True)
+               for rank, p in enumerate(processes)]
+    for t in readers:
+        t.start()
+
+    # If one rank dies the others would block in collectives, so stop them all
+    failed = None
+    try:
+        while any(p.poll() is None for p in processes):
+            for rank, p in enumerate(processes):
+                if p.poll() not in (None, 0):
+                    failed = (rank, p.returncode)
+                    break
+            if failed:
+                break
+            time.sleep(0.5)
+        else:
+            failed = next(((r, p.returncode) for r, p in enumerate(processes) if p.returncode != 0), None)
+    finally:
+        for p in processes:
+            if p.poll() is None:
+                p.terminate()
+        for p in processes:
+            p.wait()
+        for t in readers:
+            t.join(timeout=5)
+
+    if failed:
+        raise RuntimeError(f"Training process rank {failed[0]} failed with exit code {failed[1]}")
+    return result.get('save_dir', str(save_dir))
+
+
+def _send(msg_type, **payload):
+    sys.stdout.write(MESSAGE_PREFIX + json.dumps(dict(payload, type=msg_type)) + '\n')
+    sys.stdout.flush()
+
+
+def _run_rank(config_path, cores):
+    """Entry point of one rank (RANK/WORLD_SIZE/MASTER_* are already in the environment)."""
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+
+    import torch
+    import torch.distributed as dist
+    from datetime import timedelta
+    from torch import nn
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    from ultralytics.utils import RANK, WORLD_SIZE
+
+    torch.set_num_threads(max(1, len(cores) if cores else 1))
+
+    class CPUDistributedDataParallel(nn.parallel.DistributedDataParallel):
+        # ultralytics passes device_ids=[device.index]; CPU modules need None
+        def __init__(self, module, device_ids=None, **kwargs):
+            super().__init__(module, device_ids=None, **kwargs)
+
+    nn.parallel.DistributedDataParallel = CPUDistributedDataParallel
+
+    class CPUDistributedTrainer(DetectionTrainer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # ultralytics counts GPUs for world_size, which is 0 on CPU
+            self.world_size = WORLD_SIZE
+
+        def _setup_ddp(self):
+            dist.init_process_group(backend='gloo', timeout=timedelta(hours=3),
+                                    rank=RANK, world_size=self.world_size)
+
+        def final_eval(self):
+            # Standalone validation of best.pt assumes one GPU per rank, so on CPU it
+            # runs on rank 0 only as a single-process validation
+            if RANK > 0:
+                dist.barrier() # Matches rank 0's barrier after stripping the checkpoints
+                return
+            import ultralytics.engine.validator as validator_module
+            import ultralytics.models.yolo.detect.val as detect_val_module
+
+            modules = (validator_module, detect_val_module)
+            for module in modules:
+                module.RANK = module.LOCAL_RANK = -1
+            try:
+                super().final_eval()
+            finally:
+                for module in modules:
+                    module.RANK = module.LOCAL_RANK = RANK
+
+    with open(config_path) as f:
+        config = json.load(f)
+    overrides = dict(config['train_args'], model=config['model'], device='cpu')
+    trainer = CPUDistributedTrainer(overrides=overrides)
+
+    def on_train_batch_end(t):
+        nb = len(t.train_loader)
+        i = getattr(t, '_dist_batch', 0) + 1
+        t._dist_batch = i
+        if i % max(1, nb // 20) == 0 or i == nb: # ~20 updates per epoch
+            _send('progress', fraction=(t.epoch + i / nb) / t.epochs)
+
+    def on_train_epoch_start(t):
+        t._dist_batch = 0
+
+    def on_fit_epoch_end(t):
+        if RANK in (-1, 0):
+            metrics = ', '.join(f"{k.split('/')[-1]}={v:.4f}" for k, v in (t.metrics or {}).items()
+                                if isinstance(v, (int, float)))
+            # final_eval reports the best weights as epoch epochs + 1
+            stage = f"Epoch {t.epoch + 1}/{t.epochs}" if t.epoch < t.epochs else "Best model"
+            _send('log', message=f"{stage}: {metrics}")
+
+    trainer.add_callback('on_train_epoch_start', on_train_epoch_start)
+    trainer.add_callback('on_train_batch_end', on_train_batch_end)
+    trainer.add_callback('on_fit_epoch_end', on_fit_epoch_end)
+    if RANK in (-1, 0):
+        _send('log', message=f"Rank 0 pinned to cores {cores[0]}-{cores[-1]}" if cores else "Rank 0 started")
+
+    try:
+        trainer.train()
+    finally:
+        if dist.is_initialized():
+            dist.destroy_process_group()
+    _send('progress', fraction=1.0)
+    if RANK in (-1, 0):
+        _send('done', save_dir=str(trainer.save_dir))
+
+
+if __name__ == '__main__':
+    _run_rank(sys.argv[1], [int(c) for c in sys.argv[2].split(',') if c])
@@ -0,0 +1,368 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+# IoU thresholds used for mAP@0.5:0.95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+# np.trapz was renamed to np.trapezoid in NumPy 2.0
+_trapz = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def box_iou(boxes1, boxes2, eps=1e-7):
+    """
+    Computes the IoU matrix between two sets of xyxy boxes.
+
+    Args:
+        boxes1 (np.ndarray): (N, 4) boxes.
+        boxes2 (np.ndarray): (M, 4) boxes.
+
+    Returns:
+        np.ndarray: (N, M) IoU values.
+    """
+    a1, a2 = boxes1[:, None, :2], boxes1[:, None, 2:]
+    b1, b2 = boxes2[None, :, :2], boxes2[None, :, 2:]
+    inter = (np.minimum(a2, b2) - np.maximum(a1, b1)).clip(0).prod(2)
+    area1 = (boxes1[:, 2:] - boxes1[:, :2]).prod(1)
+    area2 = (boxes2[:, 2:] - boxes2[:, :2]).prod(1)
+    return inter / (area1[:, None] + area2[None, :] - inter + eps)
+
+
+def load_yolo_labels(label_path, width, height):
+    """
+    Reads a YOLO .txt label file and converts it to pixel xyxy boxes.
+
+    Returns:
+        tuple: (class ids (M,), boxes (M, 4)). Empty arrays if the file is missing.
+    """
+    if not os.path.exists(label_path):
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+
+    with open(label_path) as f:
+        rows = [line.split() for line in f if line.strip()]
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+
+    # Only the first 5 columns are used (segment points are ignored)
+    data = np.array([r[:5] for r in rows], dtype=np.float64)
+    cx, cy = data[:, 1] * width, data[:, 2] * height
+    w, h = data[:, 3] * width, data[:, 4] * height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return data[:, 0].astype(np.int64), boxes
+
+
+def match_pairs(gt_idx, pred_idx, iou):
+    """
+    Greedy one-to-one matching of candidate (ground truth, prediction) pairs.
+
+    Indices are global across all images, so a whole dataset is matched in a few
+    vectorized passes instead of one loop per image.
+
+    Args:
+        gt_idx (np.ndarray): (K,) ground-truth index of each candidate pair.
+        pred_idx (np.ndarray): (K,) prediction index of each candidate pair.
+        iou (np.ndarray): (K,) IoU of each candidate pair.
+
+    Returns:
+        tuple: (matched gt indices, matched prediction indices).
+    """
+    if gt_idx.size == 0:
+        return gt_idx, pred_idx
+    # Highest IoU first, then keep one match per prediction and per ground truth
+    order = np.argsort(-iou, kind='stable')
+    gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+    keep = np.unique(pred_idx, return_index=True)[1]
+    gt_idx, pred_idx = gt_idx[keep], pred_idx[keep]
+    keep = np.unique(gt_idx, return_index=True)[1]
+    return gt_idx[keep], pred_idx[keep]
+
+
+def compute_ap(recall, precision):
+    """Area under the precision-recall curve (COCO 101-point interpolation)."""
+    # Precision drops to 0 at the last reached recall, so no area is counted beyond it
+    mrec = np.concatenate(([0.0], recall, [recall[-1] if len(recall) else 1.0, 1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0, 0.0]))
+    # Precision envelope
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return _trapz(np.interp(x, mrec, mpre), x)
+
+
+def ap_per_class(tp, conf, pred_cls, target_cls, nc, eps=1e-16):
+    """
+    Computes per-class AP at every IoU threshold plus precision/recall at the
+    confidence that maximizes the mean F1 score.
+
+    Returns:
+        dict: 'ap' (nc, T), 'precision' (nc,), 'recall' (nc,), 'instances' (nc,).
+    """
+    order = np.argsort(-conf)
+    tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+
+    px = np.linspace(0, 1, 1000)
+    ap = np.zeros((nc, tp.shape[1]))
+    p_curve = np.zeros((nc, px.size))
+    r_curve = np.zeros((nc, px.size))
+    instances = np.bincount(target_cls, minlength=nc)[:nc]
+
+    for c in range(nc):
+        mask = pred_cls == c
+        n_gt = instances[c]
+        n_pred = mask.sum()
+        if n_pred == 0 or n_gt == 0:
+            continue
+
+        fpc = (1 - tp[mask]).cumsum(0)
+        tpc = tp[mask].cumsum(0)
+        recall = tpc / (n_gt + eps)
+        precision = tpc / (tpc + fpc)
+
+        # Curves at IoU 0.5 sampled on the confidence grid (conf is decreasing)
+        r_curve[c] = np.interp(-px, -conf[mask], recall[:, 0], left=0)
+        p_curve[c] = np.interp(-px, -conf[mask], precision[:, 0], left=1)
+
+        for j in range(tp.shape[1]):
+            ap[c, j] = compute_ap(recall[:, j], precision[:, j])
+
+    f1 = 2 * p_curve * r_curve / (p_curve + r_curve + eps)
+    present = instances > 0
+    best = f1[present].mean(0).argmax() if present.any() else 0
+    return {
+        'ap': ap,
+        'precision': p_curve[:, best],
+        'recall': r_curve[:, best],
+        'instances': instances,
+    }
+
+
+def _read_class_names(label_folder):
+    """Looks for a classes.txt next to or one level above the label folder."""
+    folder = Path(label_folder)
+    for candidate in (folder / 'classes.txt', folder.parent / 'classes.txt', folder.parent.parent / 'classes.txt'):
+        if candidate.exists():
+            with open(candidate) as f:
+                return [line.strip() for line in f if line.strip()]
+    return None
+
+
+def _image_size(result):
+    size = result.get('image_size')
+    if size and size[0] and size[1]:
+        return size
+    import cv2
+    img = cv2.imread(result['image_path'])
+    if img is None:
+        return None
+    return img.shape[1], img.shape[0]
+
+
+def _label_path(res, label_folder):
+    """Label file of a result: same relative path as the image, else by file name."""
+    rel_path = res.get('rel_path')
+    if rel_path:
+        path = os.path.join(label_folder, os.path.splitext(rel_path)[0] + '.txt')
+        if os.path.exists(path):
+            return path
+    stem = os.path.splitext(os.path.basename(res['image_path']))[0]
+    return os.path.join(label_folder, stem + '.txt')
+
+
+def evaluate(results, label_folder, class_names=None, conf_threshold=0.25, iou_threshold=0.45,
+             progress_callback=None):
+    """
+    Evaluates inference results against a folder of YOLO label files.
+
+    Args:
+        results (list): Output of YOLOManager.predict or ResultStore.load_run.
+        label_folder (str): Folder with <image stem>.txt label files, either mirroring
+            the image subfolders (for recursive runs) or flat.
+        class_names (list): Optional class names; read from classes.txt if omitted.
+        conf_threshold (float): Confidence threshold used for the confusion matrix.
+        iou_threshold (float): IoU threshold used for the confusion matrix.
+        progress_callback (func): Optional callback for logging.
+
+    Returns:
+        dict: precision, recall, map50, map, per_class list, confusion_matrix and names.
+    """
+    if not os.path.isdir(label_folder):
+        raise FileNotFoundError(f"Label folder not found: {label_folder}")
+
+    if class_names is None:
+        class_names = _read_class_names(label_folder)
+    names = list(class_names) if class_names else []
+    name_to_id = {n: i for i, n in enumerate(names)}
+
+    all_conf, all_pred_cls, all_gt_cls = [], [], []
+    # Candidate (gt, prediction) pairs with global indices: [gt_idx, pred_idx, iou]
+    pair_gt, pair_pred, pair_iou = [], [], []
+    n_gt = n_pred = 0
+    n_images = 0
+    min_iou = min(IOU_THRESHOLDS[0], iou_threshold)
+
+    for idx, res in enumerate(results):
+        size = _image_size(res)
+        if size is None:
+            continue
+        gt_cls, gt_boxes = load_yolo_labels(_label_path(res, label_folder), *size)
+
+        dets = res['detections']
+        if dets:
+            pred_boxes = np.array([d[:4] for d in dets], dtype=np.float64)
+            conf = np.array([d[4] for d in dets], dtype=np.float64)
+            pred_cls = np.array([_class_id(d, name_to_id, names) for d in dets], dtype=np.int64)
+        else:
+            pred_boxes = np.zeros((0, 4))
+            conf = np.zeros(0)
+            pred_cls = np.zeros(0, dtype=np.int64)
+
+        if gt_cls.size and pred_cls.size:
+            iou = box_iou(gt_boxes, pred_boxes)
+            gi, pj = np.nonzero(iou > min_iou)
+            pair_gt.append(gi + n_gt)
+            pair_pred.append(pj + n_pred)
+            pair_iou.append(iou[gi, pj])
+
+        all_conf.append(conf)
+        all_pred_cls.append(pred_cls)
+        all_gt_cls.append(gt_cls)
+        n_gt += gt_cls.size
+        n_pred += pred_cls.size
+        n_images += 1
+
+        if progress_callback and (idx + 1) % 1000 == 0:
+            progress_callback(f"Evaluated {idx + 1} images...")
+
+    conf = np.concatenate(all_conf) if all_conf else np.zeros(0)
+    pred_cls = np.concatenate(all_pred_cls) if all_pred_cls else np.zeros(0, dtype=np.int64)
+    gt_cls = np.concatenate(all_gt_cls) if all_gt_cls else np.zeros(0, dtype=np.int64)
+    pair_gt = np.concatenate(pair_gt) if pair_gt else np.zeros(0, dtype=np.int64)
+    pair_pred = np.concatenate(pair_pred) if pair_pred else np.zeros(0, dtype=np.int64)
+    pair_iou = np.concatenate(pair_iou) if pair_iou else np.zeros(0)
+
+    # True positives at every IoU threshold (class must match)
+    tp = np.zeros((n_pred, len(IOU_THRESHOLDS)), dtype=bool)
+    same_class = gt_cls[pair_gt] == pred_cls[pair_pred]
+    for i, threshold in enumerate(IOU_THRESHOLDS):
+        sel = same_class & (pair_iou >= threshold)
+        _, matched_pred = match_pairs(pair_gt[sel], pair_pred[sel], pair_iou[sel])
+        tp[matched_pred, i] = True
+
+    nc = max(len(names), int(pred_cls.max()) + 1 if pred_cls.size else 0,
+             int(gt_cls.max()) + 1 if gt_cls.size else 0)
+    names = names + [str(i) for i in range(len(names), nc)]
+
+    stats = ap_per_class(tp, conf, pred_cls, gt_cls, nc)
+
+    # Confusion matrix: rows = predicted class, columns = true class, last index = background
+    confident = conf >= conf_threshold
+    sel = confident[pair_pred] & (pair_iou > iou_threshold)
+    matched_gt, matched_pred = match_pairs(pair_gt[sel], pair_pred[sel], pair_iou[sel])
+    matrix = np.zeros((nc + 1, nc + 1), dtype=np.int64)
+    np.add.at(matrix, (pred_cls[matched_pred], gt_cls[matched_gt]), 1)
+    missed = np.ones(n_gt, dtype=bool)
+    missed[matched_gt] = False
+    np.add.at(matrix, (nc, gt_cls[missed]), 1)
+    extra = confident.copy()
+    extra[matched_pred] = False
+    np.add.at(matrix, (pred_cls[extra], nc), 1)
+
+    present = stats['instances'] > 0
+    ap = stats['ap']
+    per_class = [
+        {
+            'name': names[c],
+            'instances': int(stats['instances'][c]),
+            'precision': float(stats['precision'][c]),
+            'recall': float(stats['recall'][c]),
+            'ap50': float(ap[c, 0]),
+            'ap': float(ap[c].mean()),
+        }
+        for c in range(nc)
+    ]
+
+    metrics = {
+        'images': n_images,
+        'instances': int(gt_cls.size),
+        'precision': float(stats['precision'][present].mean()) if present.any() else 0.0,
+        'recall': float(stats['recall'][present].mean()) if present.any() else 0.0,
+        'map50': float(ap[present, 0].mean()) if present.any() else 0.0,
+        'map': float(ap[present].mean()) if present.any() else 0.0,
+        'per_class': per_class,
+        'confusion_matrix': matrix,
+        'names': names,
+    }
+
+    if progress_callback:
+        progress_callback(
+            f"Evaluation complete: {n_images} images, mAP50 {metrics['map50']:.3f}, mAP50-95 {metrics['map']:.3f}"
+        )
+    return metrics
+
+
+def _class_id(det, name_to_id, names):
+    """Class id of a detection: class names take priority so ids match the label files."""
+    cls_name = det[5]
+    if cls_name in name_to_id:
+        return name_to_id[cls_name]
+    if len(det) > 6:
+        return int(det[6])
+    if str(cls_name).isdigit():
+        return int(cls_name)
+    raise ValueError(f"Unknown class name '{cls_name}'. Known classes: {', '.join(names)}")
+
+
+def find_disagreements(detections_by_model, iou_threshold=0.5):
+    """
+    Flags boxes that are not confirmed by every other model.
+
+    Args:
+        detections_by_model (dict): {label: [[x1, y1, x2, y2, conf, cls_name, ...], ...]}.
+        iou_threshold (float): Minimum IoU for two same-class boxes to agree.
+
+    Returns:
+        dict: {label: [bool per box]}, True where another model has no matching box.
+    """
+    arrays = {}
+    for label, dets in detections_by_model.items():
+        boxes = np.array([d[:4] for d in dets], dtype=np.float64).reshape(-1, 4)
+        names = np.array([str(d[5]) for d in dets])
+        arrays[label] = (boxes, names)
+
+    flags = {}
+    for label, (boxes, names) in arrays.items():
+        missing = np.zeros(len(boxes), dtype=bool)
+        for other, (other_boxes, other_names) in arrays.items():
+            if other == label or len(boxes) == 0:
+                continue
+            if len(other_boxes) == 0:
+                missing[:] = True
+                continue
+            iou = box_iou(boxes, other_boxes) * (names[:, None] == other_names[None, :])
+            missing |= iou.max(1) < iou_threshold
+        flags[label] = missing.tolist()
+    return flags
+
+
+def format_report(metrics):
+    """Formats evaluation metrics as a plain-text table."""
+    lines = [
+        f"Images: {metrics['images']}  Instances: {metrics['instances']}",
+        f"Precision: {metrics['precision']:.3f}  Recall: {metrics['recall']:.3f}",
+        f"mAP50: {metrics['map50']:.3f}  mAP50-95: {metrics['map']:.3f}",
+        "",
+        f"{'Class':<16}{'N':>7}{'P':>7}{'R':>7}{'AP50':>7}{'AP':>7}",
+    ]
+    for c in metrics['per_class']:
+        lines.append(
+            f"{c['name'][:15]:<16}{c['instances']:>7}{c['precision']:>7.3f}{c['recall']:>7.3f}"
+            f"{c['ap50']:>7.3f}{c['ap']:>7.3f}"
+        )
+
+    names = metrics['names'] + ['background']
+    matrix = metrics['confusion_matrix']
+    lines += ["", "Confusion matrix (rows = predicted, columns = true):"]
+    lines.append(" " * 12 + "".join(f"{n[:8]:>9}" for n in names))
+    for i, row in enumerate(matrix):
+        lines.append(f"{names[i][:11]:<12}" + "".join(f"{v:>9}" for v in row))
+    return "\n".join(lines)
@@ -0,0 +1,175 @@
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def class_color(cls_id):
+    """Deterministic BGR color per class id."""
+    palette = [
+        (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+        (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+        (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+        (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255),
+    ]
+    return palette[int(cls_id) % len(palette)]
+
+
+def format_label_lines(detections, image_size, save_conf=True):
+    """
+    Converts pixel xyxy detections to YOLO label lines (class cx cy w h [conf]),
+    normalized by image size.
+    """
+    width, height = image_size
+    lines = []
+    for det in detections:
+        x1, y1, x2, y2, conf, cls_name = det[:6]
+        cls_id = det[6] if len(det) > 6 else cls_name
+        cx = (x1 + x2) / 2 / width
+        cy = (y1 + y2) / 2 / height
+        w = (x2 - x1) / width
+        h = (y2 - y1) / height
+        line = f"{cls_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}"
+        if save_conf:
+            line += f" {conf:.4f}"
+        lines.append(line)
+    return lines
+
+
+def draw_detections(img, detections):
+    """Draws boxes and labels on a BGR image in place."""
+    import cv2
+
+    thickness = max(1, round(max(img.shape[:2]) / 400))
+    for det in detections:
+        x1, y1, x2, y2, conf, cls_name = det[:6]
+        color = class_color(det[6] if len(det) > 6 else 0)
+        p1, p2 = (int(x1), int(y1)), (int(x2), int(y2))
+        cv2.rectangle(img, p1, p2, color, thickness, cv2.LINE_AA)
+
+        text = f"{cls_name} {conf:.2f}"
+        scale = thickness / 3
+        (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        top = p1[1] - th - 4 if p1[1] - th - 4 >= 0 else p1[1]
+        cv2.rectangle(img, (p1[0], top), (p1[0] + tw + 2, top + th + 4), color, -1)
+        cv2.putText(img, text, (p1[0] + 1, top + th + 1), cv2.FONT_HERSHEY_SIMPLEX, scale,
+                    (255, 255, 255), thickness, cv2.LINE_AA)
+    return img
+
+
+def _source_name(res):
+    return res.get('rel_path') or os.path.basename(res['image_path'])
+
+
+def output_stems(results):
+    """
+    Output path (without extension) of every result. Subfolders of recursive runs
+    are mirrored; images that differ only by extension (a.jpg, a.png) keep it in
+    the name (a_jpg, a_png) so their outputs do not overwrite each other.
+    """
+    stems = [os.path.splitext(_source_name(res)) for res in results]
+    counts = Counter(stem.lower() for stem, _ in stems)
+    return [f"{stem}_{ext.lstrip('.')}" if counts[stem.lower()] > 1 else stem for stem, ext in stems]
+
+
+def export_result(res, output_folder, write_images=True, write_labels=True,
+                  jpeg_quality=90, max_size=None, save_conf=True, stem=None):
+    """
+    Exports one inference result: annotated image to images/ and YOLO prediction
+    labels to labels/. Returns False if the image could not be read or an output
+    could not be written.
+    """
+    import cv2
+
+    stem = stem or output_stems([res])[0]
+    detections = res['detections']
+
+    if write_images:
+        img = cv2.imread(res['image_path'])
+        if img is None:
+            return False
+        draw_detections(img, detections)
+        if max_size and max(img.shape[:2]) > max_size:
+            scale = max_size / max(img.shape[:2])
+            img = cv2.resize(img, (round(img.shape[1] * scale), round(img.shape[0] * scale)),
+                             interpolation=cv2.INTER_AREA)
+        image_out = os.path.join(output_folder, 'images', stem + '.jpg')
+        try:
+            os.makedirs(os.path.dirname(image_out), exist_ok=True)
+            if not cv2.imwrite(image_out, img, [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]):
+                return False
+        except (OSError, cv2.error):
+            return False
+
+    if write_labels:
+        image_size = res.get('image_size')
+        if not image_size or not image_size[0]:
+            img = cv2.imread(res['image_path'])
+            if img is None:
+                return False
+            image_size = (img.shape[1], img.shape[0])
+        lines = format_label_lines(detections, image_size, save_conf)
+        label_out = os.path.join(output_folder, 'labels', stem + '.txt')
+        try:
+            os.makedirs(os.path.dirname(label_out), exist_ok=True)
+            with open(label_out, 'w') as f:
+                f.write('\n'.join(lines) + ('\n' if lines else ''))
+        except OSError:
+            return False
+
+    return True
+
+
+def export_results(results, output_folder, write_images=True, write_labels=True,
+                   jpeg_quality=90, max_size=None, save_conf=True, workers=None,
+                   progress_callback=None, log_callback=None):
+    """
+    Exports a result set with a thread pool (OpenCV decode/encode and file I/O
+    release the GIL, so the work is I/O-bound rather than stuck in one loop).
+
+    Args:
+        results (list): Output of YOLOManager.predict or ResultStore.load_run.
+        output_folder (str): Destination; images/ and labels/ are created inside.
+        write_images (bool): Write annotated JPEG images.
+        write_labels (bool): Write YOLO-format prediction .txt files.
+        jpeg_quality (int): JPEG quality (1-100).
+        max_size (int): Optional max length of the longer image side.
+        save_conf (bool): Append the confidence to every label line.
+        workers (int): Thread count (default: 2 x CPU count, up to 32).
+        progress_callback (func): Optional callback receiving percent done.
+        log_callback (func): Optional callback for logging.
+
+    Returns:
+        tuple: (number of exported results, number of results that failed).
+    """
+    if write_images:
+        os.makedirs(os.path.join(output_folder, 'images'), exist_ok=True)
+    if write_labels:
+        os.makedirs(os.path.join(output_folder, 'labels'), exist_ok=True)
+
+    total = len(results)
+    workers = workers or min(32, (os.cpu_count() or 1) * 2)
+    done = exported = 0
+    last_percent = -1
+
+    if log_callback:
+        log_callback(f"Exporting {total} results to {output_folder} with {workers} threads...")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(export_result, res, output_folder, write_images, write_labels,
+                        jpeg_quality, max_size, save_conf, stem)
+            for res, stem in zip(results, output_stems(results))
+        ]
+        for future in as_completed(futures):
+            exported += bool(future.result())
+            done += 1
+            percent = int(done / total * 100)
+            if progress_callback and percent != last_percent:
+                progress_callback(percent)
+                last_percent = percent
+
+    failed = total - exported
+    if log_callback:
+        log_callback(f"Exported {exported}/{total} results to {output_folder}"
+                     + (f", {failed} failed (unreadable image or write error)" if failed else ""))
+    return exported, failed
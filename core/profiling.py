@@ -0,0 +1,282 @@
+"""
+Lightweight stage profiler.
+
+Wrap stages in `with span("decode"):`. When profiling is disabled (the default)
+span() returns a shared no-op object, so instrumented code costs one flag check.
+Enable it with the YOLO_PROFILE=1 environment variable or enable(). Each run
+aggregates per-stage duration histograms and can be exported as a Chrome trace
+(open in chrome://tracing or https://ui.perfetto.dev).
+
+Recordings go to the Profiler of the current run, so runs on different worker
+threads are kept apart: a worker calls start_run() on its own thread, thread
+pool tasks are wrapped with bind(), and other threads can record into a run
+with activate(). Spans outside any run go to a process-wide default profiler.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+MAX_EVENTS = 1_000_000  # Trace events kept per run; statistics are always kept
+N_BUCKETS = 32          # Histogram buckets: bucket i counts durations < 2**i microseconds
+
+_enabled = os.environ.get('YOLO_PROFILE', '') not in ('', '0')
+_pid = os.getpid()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'args', 'begin')
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.begin = None
+
+    def start(self):
+        self.begin = time.perf_counter_ns()
+        return self
+
+    def stop(self):
+        if self.begin is not None:
+            self.profiler.record(self.name, self.begin, time.perf_counter_ns(), self.args)
+            self.begin = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def _percentile(hist, count, q):
+    """Upper bound (in us) of the histogram bucket containing quantile q."""
+    target = q * count
+    seen = 0
+    for i, n in enumerate(hist):
+        seen += n
+        if seen >= target:
+            return float(2 ** i)
+    return float(2 ** (len(hist) - 1))
+
+
+class Profiler:
+    """Spans and per-stage statistics of one run."""
+
+    def __init__(self, name='run'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._events = []
+        self._stats = {}
+
+    def record(self, name, begin_ns, end_ns, args=None):
+        """Records a finished stage given perf_counter_ns timestamps."""
+        if not _enabled:
+            return
+        duration_us = (end_ns - begin_ns) / 1000
+        bucket = min(N_BUCKETS - 1, max(0, int(duration_us).bit_length()))
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {'count': 0, 'total_us': 0.0, 'max_us': 0.0, 'hist': [0] * N_BUCKETS}
+            stats['count'] += 1
+            stats['total_us'] += duration_us
+            stats['max_us'] = max(stats['max_us'], duration_us)
+            stats['hist'][bucket] += 1
+            if len(self._events) < MAX_EVENTS:
+                self._events.append((name, begin_ns, end_ns, threading.get_ident(), args))
+
+    def record_sequence(self, begin_ns, stages):
+        """
+        Records back-to-back stages measured elsewhere (e.g. ultralytics' per-result
+        speed dict) starting at begin_ns. stages: [(name, milliseconds), ...]
+        """
+        if not _enabled:
+            return
+        for name, ms in stages:
+            end_ns = begin_ns + int(ms * 1e6)
+            self.record(name, begin_ns, end_ns)
+            begin_ns = end_ns
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._stats.clear()
+
+    def summary(self):
+        """Per-stage statistics: count, total/mean/max ms, approximate p50/p95 ms and histogram."""
+        with self._lock:
+            stats = {name: dict(s, hist=list(s['hist'])) for name, s in self._stats.items()}
+        return {
+            name: {
+                'count': s['count'],
+                'total_ms': s['total_us'] / 1000,
+                'mean_ms': s['total_us'] / s['count'] / 1000,
+                'max_ms': s['max_us'] / 1000,
+                'p50_ms': min(_percentile(s['hist'], s['count'], 0.5), s['max_us']) / 1000,
+                'p95_ms': min(_percentile(s['hist'], s['count'], 0.95), s['max_us']) / 1000,
+                'hist': s['hist'],
+            }
+            for name, s in stats.items()
+        }
+
+    def format_summary(self, stats=None):
+        stats = self.summary() if stats is None else stats
+        lines = [f"{'Stage':<24}{'Count':>8}{'Total ms':>12}{'Mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'Max ms':>10}"]
+        for name, s in sorted(stats.items(), key=lambda kv: -kv[1]['total_ms']):
+            lines.append(
+                f"{name[:23]:<24}{s['count']:>8}{s['total_ms']:>12.1f}{s['mean_ms']:>10.2f}"
+                f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}"
+            )
+        return "\n".join(lines)
+
+    def export_trace(self, path):
+        """Writes recorded spans as a Chrome trace event file."""
+        with self._lock:
+            events = list(self._events)
+        origin = min((e[1] for e in events), default=0)
+
+        trace = []
+        for name, begin_ns, end_ns, tid, args in events:
+            event = {
+                'name': name,
+                'cat': 'stage',
+                'ph': 'X',
+                'ts': (begin_ns - origin) / 1000,
+                'dur': (end_ns - begin_ns) / 1000,
+                'pid': _pid,
+                'tid': tid,
+            }
+            if args:
+                event['args'] = {k: str(v) for k, v in args.items()}
+            trace.append(event)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def finish(self, output_dir=os.path.join('runs', 'traces'), log_callback=None, run_name=None):
+        """
+        Exports the trace of this run, logs the stage summary and resets the
+        profiler. Does nothing when profiling is disabled.
+
+        Returns:
+            str: Path of the trace file, or None.
+        """
+        if not _enabled:
+            return None
+        run_name = run_name or self.name
+        path = os.path.join(output_dir, f"{run_name}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        self.export_trace(path)
+        if log_callback:
+            log_callback(f"Profile ({run_name}):\n{self.format_summary()}\nTrace saved to {path}")
+        self.reset()
+        return path
+
+
+_default = Profiler('default')
+_current = contextvars.ContextVar('profiling_run', default=None)
+
+
+def current():
+    """Profiler of the run active on this thread (the default profiler outside runs)."""
+    return _current.get() or _default
+
+
+def start_run(name):
+    """Starts a new run and makes it current on the calling thread."""
+    profiler = Profiler(name)
+    _current.set(profiler)
+    return profiler
+
+
+@contextlib.contextmanager
+def activate(profiler):
+    """Records into profiler (e.g. a worker's run) inside the with block."""
+    token = _current.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _current.reset(token)
+
+
+def bind(fn):
+    """Wraps fn so it records into the caller's current run on any thread (for thread pools)."""
+    profiler = _current.get()
+    if profiler is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        with activate(profiler):
+            return fn(*args, **kwargs)
+    return bound
+
+
+def span(name, **args):
+    """Returns a context manager timing one stage (no-op when disabled)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(current(), name, args)
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled():
+    return _enabled
+
+
+def record(name, begin_ns, end_ns, args=None):
+    """Records a finished stage of the current run given perf_counter_ns timestamps."""
+    if _enabled:
+        current().record(name, begin_ns, end_ns, args)
+
+
+def record_sequence(begin_ns, stages):
+    """See Profiler.record_sequence; records into the current run."""
+    if _enabled:
+        current().record_sequence(begin_ns, stages)
+
+
+def reset():
+    current().reset()
+
+
+def summary():
+    return current().summary()
+
+
+def format_summary(stats=None):
+    return current().format_summary(stats)
+
+
+def export_trace(path):
+    return current().export_trace(path)
+
+
+def finish_run(run_name, output_dir=os.path.join('runs', 'traces'), log_callback=None):
+    """Exports and resets the current run (see Profiler.finish) under run_name."""
+    return current().finish(output_dir, log_callback, run_name=run_name)
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_STORE_PATH = os.path.join("runs", "inference", "results.db")
+
+# Cache of model file hashes: {abs_path: (size, mtime, digest)}
+_model_hash_cache = {}
+
+
+def hash_bytes(data):
+    """Content hash used for images and result keys."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Hash a file by content, streaming it in chunks.
+    Results are memoized per (size, mtime) so large model files are only read once.
+    """
+    abs_path = os.path.abspath(path)
+    st = os.stat(abs_path)
+    cached = _model_hash_cache.get(abs_path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime:
+        return cached[2]
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(abs_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _model_hash_cache[abs_path] = (st.st_size, st.st_mtime, digest)
+    return digest
+
+
+def make_result_key(image_hash, model_hash, options):
+    """
+    Builds the cache key of one inference result.
+
+    Args:
+        image_hash (str): Content hash of the image file.
+        model_hash (str): Content hash of the model file.
+        options (dict): Inference options that affect the output (e.g. use_gray).
+    """
+    opts = json.dumps(options, sort_keys=True)
+    return hash_bytes(f"{image_hash}|{model_hash}|{opts}".encode())
+
+
+def _relative_path(image_path, image_folder):
+    """Path of an image relative to its run folder, with '/' separators."""
+    if not image_folder:
+        return os.path.basename(image_path)
+    return os.path.relpath(os.path.abspath(image_path), image_folder).replace(os.sep, '/')
+
+
+class ResultStore:
+    """
+    On-disk store of inference results backed by SQLite.
+
+    Each result is keyed by image content + model + options, so unchanged images
+    can be skipped on re-runs. Detections are stored one row per box (one column
+    per field) so they can be queried directly with SQL.
+    A connection is bound to the thread that created the store.
+    """
+
+    COMMIT_EVERY = 200
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._pending = 0
+        self._create_tables()
+
+    def _create_tables(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                image_hash TEXT NOT NULL,
+                model_hash TEXT NOT NULL,
+                options TEXT NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                created REAL
+            );
+            CREATE TABLE IF NOT EXISTS detections (
+                key TEXT NOT NULL,
+                x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+                conf REAL,
+                cls_id INTEGER,
+                cls_name TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_detections_key ON detections(key);
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model_path TEXT,
+                image_folder TEXT,
+                options TEXT,
+                created REAL
+            );
+            CREATE TABLE IF NOT EXISTS run_images (
+                run_id INTEGER NOT NULL,
+                image_path TEXT NOT NULL,
+                key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_run_images_run ON run_images(run_id);
+        """)
+        self.conn.commit()
+
+    def get(self, key):
+        """
+        Returns the cached result for key as {'detections': [...], 'image_size': (w, h)},
+        or None if it is not in the store.
+        """
+        row = self.conn.execute(
+            "SELECT width, height FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        detections = [
+            [x1, y1, x2, y2, conf, cls_name, cls_id]
+            for x1, y1, x2, y2, conf, cls_id, cls_name in self.conn.execute(
+                "SELECT x1, y1, x2, y2, conf, cls_id, cls_name FROM detections "
+                "WHERE key = ? ORDER BY rowid", (key,)
+            )
+        ]
+        return {'detections': detections, 'image_size': (row[0], row[1])}
+
+    def put(self, key, image_hash, model_hash, options, image_size, detections):
+        """
+        Appends one result to the store.
+
+        Args:
+            detections (list): [x1, y1, x2, y2, conf, cls_name, cls_id] per box.
+        """
+        width, height = image_size if image_size else (None, None)
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, image_hash, model_hash, json.dumps(options, sort_keys=True),
+             width, height, time.time())
+        )
+        if cur.rowcount:
+            self.conn.executemany(
+                "INSERT INTO detections VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, x1, y1, x2, y2, conf, cls_id, cls_name)
+                 for x1, y1, x2, y2, conf, cls_name, cls_id in detections]
+            )
+        self._maybe_commit()
+
+    def begin_run(self, model_path, image_folder, options):
+        """Registers a new inference run and returns its id."""
+        cur = self.conn.execute(
+            "INSERT INTO runs (model_path, image_folder, options, created) VALUES (?, ?, ?, ?)",
+            (os.path.abspath(model_path), os.path.abspath(image_folder),
+             json.dumps(options, sort_keys=True), time.time())
+        )
+        self.conn.commit()
+        return cur.lastrowid
+
+    def add_to_run(self, run_id, image_path, key):
+        self.conn.execute(
+            "INSERT INTO run_images VALUES (?, ?, ?)", (run_id, image_path, key)
+        )
+        self._maybe_commit()
+
+    def list_runs(self):
+        """Returns all runs, newest first."""
+        rows = self.conn.execute("""
+            SELECT r.id, r.model_path, r.image_folder, r.options, r.created, COUNT(ri.key)
+            FROM runs r LEFT JOIN run_images ri ON ri.run_id = r.id
+            GROUP BY r.id ORDER BY r.id DESC
+        """).fetchall()
+        return [
+            {
+                'id': run_id,
+                'model_path': model_path,
+                'image_folder': image_folder,
+                'options': json.loads(options),
+                'created': created,
+                'image_count': count,
+            }
+            for run_id, model_path, image_folder, options, created, count in rows
+        ]
+
+    def load_run(self, run_id):
+        """
+        Loads a past run in the same format as YOLOManager.predict returns.
+        """
+        results = []
+        current = None
+        row = self.conn.execute("SELECT image_folder FROM runs WHERE id = ?", (run_id,)).fetchone()
+        image_folder = row[0] if row else None
+        rows = self.conn.execute("""
+            SELECT ri.rowid, ri.image_path, r.width, r.height,
+                   d.x1, d.y1, d.x2, d.y2, d.conf, d.cls_name, d.cls_id
+            FROM run_images ri
+            JOIN results r ON r.key = ri.key
+            LEFT JOIN detections d ON d.key = ri.key
+            WHERE ri.run_id = ?
+            ORDER BY ri.rowid, d.rowid
+        """, (run_id,))
+        for row_id, image_path, width, height, *det in rows:
+            if current is None or current[0] != row_id:
+                entry = {
+                    'image_path': image_path,
+                    'rel_path': _relative_path(image_path, image_folder),
+                    'image_size': (width, height),
+                    'detections': [],
+                }
+                results.append(entry)
+                current = (row_id, entry)
+            if det[0] is not None:
+                current[1]['detections'].append(det)
+        # Same order as YOLOManager.predict
+        results.sort(key=lambda r: r['rel_path'])
+        return results
+
+    def _maybe_commit(self):
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
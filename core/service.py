@@ -0,0 +1,270 @@
+"""
+Local HTTP inference service.
+
+Keeps models loaded and groups concurrent requests into micro-batches:
+
+    python -m core.service --model runs/detect/my_model/weights/best.pt --port 8765
+
+Endpoints:
+    POST /predict   JSON {"image_path": ..., "model": ..., "use_gray": false}, or raw
+                    image bytes with optional ?model=...&use_gray=1 query parameters
+    GET  /metrics   Queue depth, batch sizes and latency per model
+    GET  /health    Service status and loaded models
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from core.yolo_engine import YOLOManager, decode_image, model_labels
+
+DEFAULT_PORT = 8765
+LATENCY_WINDOW = 1000 # Recent requests kept for latency percentiles
+REQUEST_TIMEOUT = 60  # Seconds a request may wait for its batch
+
+
+class _Request:
+    __slots__ = ('image', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, image):
+        self.image = image
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Runs one loaded model on its own thread. Requests are queued and collected into
+    a batch until max_batch images arrive or window_ms passes after the first one.
+    """
+
+    def __init__(self, manager, model_path, max_batch=8, window_ms=5.0):
+        self.manager = manager
+        self.model_path = model_path
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.model = manager.load_model(model_path)
+        self.queue = queue.Queue()
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_images = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{os.path.basename(model_path)}",
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, image, timeout=REQUEST_TIMEOUT):
+        """Queues a decoded image and waits for (detections, image_size)."""
+        request = _Request(image)
+        self.queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("Inference request timed out")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                outputs = self.manager.predict_arrays(self.model, self.model_path, [r.image for r in batch])
+                for request, output in zip(batch, outputs):
+                    request.result = output
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+
+            now = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.batched_images += len(batch)
+                for request in batch:
+                    self.requests += 1
+                    self.errors += request.error is not None
+                    self.latencies.append(now - request.enqueued)
+            for request in batch:
+                request.image = None
+                request.done.set()
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            batches, images = self.batches, self.batched_images
+            requests, errors = self.requests, self.errors
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else None
+
+        return {
+            'queue_depth': self.queue.qsize(),
+            'requests': requests,
+            'errors': errors,
+            'batches': batches,
+            'mean_batch_size': images / batches if batches else None,
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'p99': percentile(0.99),
+                           'max': latencies[-1] * 1000 if latencies else None},
+        }
+
+
+class InferenceService:
+    """
+    Serves a fixed set of models. Only models given at startup can be used, so
+    clients cannot make the service load arbitrary files.
+    """
+
+    def __init__(self, model_paths, max_batch=8, window_ms=5.0):
+        if not model_paths:
+            raise ValueError("At least one model is required")
+        self.manager = YOLOManager()
+        self.labels = model_labels(model_paths)
+        self.batchers = {
+            label: MicroBatcher(self.manager, path, max_batch, window_ms)
+            for label, path in zip(self.labels, model_paths)
+        }
+        self.paths = {os.path.abspath(path): label for label, path in zip(self.labels, model_paths)}
+        self.started = time.time()
+
+    def resolve_model(self, model):
+        """Maps a model label or path (None for the first model) to its label."""
+        if not model:
+            return self.labels[0]
+        if model in self.batchers:
+            return model
+        label = self.paths.get(os.path.abspath(model))
+        if label is None:
+            raise KeyError(f"Model not loaded: {model}")
+        return label
+
+    def predict(self, data, model=None, use_gray=False):
+        """Runs one encoded image through a model; returns a JSON-serializable dict."""
+        label = self.resolve_model(model)
+        image = decode_image(data, use_gray)
+        if image is None:
+            raise ValueError("Could not decode image")
+        start = time.perf_counter()
+        detections, (width, height) = self.batchers[label].submit(image)
+        return {
+            'model': label,
+            'image_size': [width, height],
+            'detections': [
+                {'box': det[:4], 'conf': det[4], 'cls_name': det[5], 'cls_id': det[6]}
+                for det in detections
+            ],
+            'latency_ms': (time.perf_counter() - start) * 1000,
+        }
+
+    def metrics(self):
+        return {
+            'uptime_s': time.time() - self.started,
+            'models': {label: batcher.metrics() for label, batcher in self.batchers.items()},
+        }
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service = None # Set by make_server
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass # Keep the console quiet under load
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, {'status': 'ok', 'models': self.service.labels})
+        elif path == '/metrics':
+            self._send_json(200, self.service.metrics())
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint: {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/predict':
+            self._send_json(404, {'error': f"Unknown endpoint: {url.path}"})
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                params = json.loads(body or b'{}')
+                if 'image_path' not in params:
+                    raise ValueError("Missing 'image_path'")
+                with open(params['image_path'], 'rb') as f:
+                    data = f.read()
+            else:
+                params = query
+                data = body
+            use_gray = str(params.get('use_gray', '')).lower() in ('1', 'true', 'yes')
+            result = self.service.predict(data, params.get('model'), use_gray)
+            if 'image_path' in params:
+                result['image_path'] = params['image_path']
+            self._send_json(200, result)
+        except KeyError as e:
+            self._send_json(404, {'error': str(e.args[0])})
+        except (ValueError, OSError) as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT):
+    """Creates a threaded HTTP server (one thread per connection) for the service."""
+    handler = type('BoundServiceHandler', (ServiceHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local YOLO inference service with micro-batching")
+    parser.add_argument('--model', action='append', required=True,
+                        help="Model to serve (.pt or .onnx); repeat to serve several")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch', type=int, default=8, help="Max images per batch")
+    parser.add_argument('--window-ms', type=float, default=5.0,
+                        help="How long to wait for more requests after the first one")
+    args = parser.parse_args(argv)
+
+    service = InferenceService(args.model, args.max_batch, args.window_ms)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving {', '.join(service.labels)} on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
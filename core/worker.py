@@ -1,7 +1,15 @@
 from PySide6.QtCore import QThread, Signal
 from core.yolo_engine import YOLOManager
-from core.dataset_utils import create_data_yaml
+from core.dataset_utils import prepare_dataset, store_label_caches
+from core.checkpoint import run_save_dir
+from core.result_store import ResultStore
+from core.evaluation import evaluate
+from core.autotune import autotune
+from core.export import export_results
+from core import profiling
+import shutil
 import traceback
+import time
 import sys
 import io
 
@@ -17,16 +25,21 @@ class TrainingWorker(QThread):
         self.manager = YOLOManager()
 
     def run(self):
+        profiling.start_run("train")
         try:
             self.log_signal.emit("Preparing dataset...")
-            # Generate data.yaml
-            data_yaml_path = "data.yaml" # Temp path or inside project
-            create_data_yaml(
+            prepared_yaml = prepare_dataset(
                 self.config['train_images'],
                 self.config['val_images'],
                 self.config['classes'],
-                data_yaml_path
+                log_callback=lambda msg: self.log_signal.emit(msg)
             )
+            # Each run keeps its own copy of the data config, so concurrent runs never share one
+            save_dir = run_save_dir(self.config.get('project_name', 'yolo_project'),
+                                    self.config.get('model_name', 'my_model'))
+            save_dir.mkdir(parents=True, exist_ok=True)
+            data_yaml_path = str(save_dir / "data.yaml")
+            shutil.copyfile(prepared_yaml, data_yaml_path)
             self.config['data_yaml'] = data_yaml_path
             
             self.log_signal.emit(f"Data config created at {data_yaml_path}")
@@ -37,26 +50,120 @@ class TrainingWorker(QThread):
                 progress_callback=lambda p: self.progress_signal.emit(p),
                 log_callback=lambda msg: self.log_signal.emit(msg)
             )
+            store_label_caches(prepared_yaml)
+            profiling.finish_run("train", log_callback=lambda msg: self.log_signal.emit(msg))
             
             self.finished_signal.emit()
         except Exception as e:
             self.error_signal.emit(str(e))
             self.log_signal.emit(f"Error: {traceback.format_exc()}")
 
+class AutotuneWorker(QThread):
+    log_signal = Signal(str)
+    result_signal = Signal(dict)
+    error_signal = Signal(str)
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+
+    def run(self):
+        try:
+            self.config['data_yaml'] = prepare_dataset(
+                self.config['train_images'],
+                self.config['val_images'],
+                self.config['classes'],
+                log_callback=lambda msg: self.log_signal.emit(msg)
+            )
+
+            result = autotune(self.config, log_callback=lambda msg: self.log_signal.emit(msg))
+            self.result_signal.emit(result)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+            self.log_signal.emit(f"Error: {traceback.format_exc()}")
+
 class InferenceWorker(QThread):
     results_signal = Signal(list)
     error_signal = Signal(str)
 
-    def __init__(self, model_path, image_folder, use_gray=False):
+    def __init__(self, model_path, image_folder, use_gray=False, use_cache=True, compare_paths=None,
+                 recursive=False):
         super().__init__()
         self.model_path = model_path
         self.image_folder = image_folder
         self.use_gray = use_gray
+        self.use_cache = use_cache
+        self.compare_paths = compare_paths or []
+        self.recursive = recursive
         self.manager = YOLOManager()
+        self.emitted_ns = None # When results were emitted, to time Qt signal delivery
+        self.profiler = None # Profile of the run; the GUI thread adds the Qt delivery to it
 
     def run(self):
+        self.profiler = profiling.start_run("inference")
         try:
-            results = self.manager.predict(self.model_path, self.image_folder, self.use_gray)
+            if self.use_cache:
+                # The SQLite connection must be created in the worker thread
+                with ResultStore() as store:
+                    results = self.predict(store)
+            else:
+                results = self.predict(None)
+            self.emitted_ns = time.perf_counter_ns()
             self.results_signal.emit(results)
         except Exception as e:
             self.error_signal.emit(str(e))
+
+    def predict(self, store):
+        if self.compare_paths:
+            return self.manager.predict_compare(
+                [self.model_path] + self.compare_paths, self.image_folder, self.use_gray, store=store,
+                recursive=self.recursive
+            )
+        return self.manager.predict(self.model_path, self.image_folder, self.use_gray, store=store,
+                                    recursive=self.recursive)
+
+class EvaluationWorker(QThread):
+    log_signal = Signal(str)
+    metrics_signal = Signal(dict)
+    error_signal = Signal(str)
+
+    def __init__(self, results, label_folder):
+        super().__init__()
+        self.results = results
+        self.label_folder = label_folder
+
+    def run(self):
+        try:
+            metrics = evaluate(
+                self.results,
+                self.label_folder,
+                progress_callback=lambda msg: self.log_signal.emit(msg)
+            )
+            self.metrics_signal.emit(metrics)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+class ExportWorker(QThread):
+    log_signal = Signal(str)
+    progress_signal = Signal(int)
+    finished_signal = Signal(int, int)
+    error_signal = Signal(str)
+
+    def __init__(self, results, output_folder, options):
+        super().__init__()
+        self.results = results
+        self.output_folder = output_folder
+        self.options = options
+
+    def run(self):
+        try:
+            count, failed = export_results(
+                self.results,
+                self.output_folder,
+                progress_callback=lambda p: self.progress_signal.emit(p),
+                log_callback=lambda msg: self.log_signal.emit(msg),
+                **self.options
+            )
+            self.finished_signal.emit(count, failed)
+        except Exception as e:
+            self.error_signal.emit(str(e))
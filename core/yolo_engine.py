@@ -1,8 +1,45 @@
 from ultralytics import YOLO
 import os
 import shutil
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from core import profiling
+from core.dataset_utils import restore_label_caches
+from core.discovery import iter_images
+from core.result_store import hash_bytes, hash_file, make_result_key
+from core.checkpoint import (run_save_dir, training_fingerprint, find_resume_checkpoint, discard_checkpoint,
+                             read_state, write_state)
+
+CPU_DISTRIBUTED = 'CPU (多程序)' # Device option for multi-process CPU training
+
+def map_device(device_str):
+    """Map device string from the UI to YOLO format."""
+    if device_str in ('CPU', CPU_DISTRIBUTED):
+        return 'cpu'
+    elif device_str == 'GPU (CUDA)':
+        return '0'
+    elif device_str == 'GPU (MPS)':
+        return 'mps'
+    # 'Auto' remains None
+    return None
+
+def base_model_for(version):
+    """Determine the pretrained base model of a YOLO version."""
+    if version == 'YOLOv8':
+        return 'yolov8n.pt'
+    elif version == 'YOLOv11':
+        return 'yolo11n.pt'
+    elif version == 'YOLOv5':
+        return 'yolov5nu.pt' # Ultralytics supports v5 models
+    return 'yolov8n.pt'
 
 class YOLOManager:
+    PREDICT_BATCH = 8 # Images decoded and sent to the model(s) at once
+    DISCOVERY_WORKERS = 8 # Threads walking subfolders in recursive mode
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
     def __init__(self):
         self.model = None
 
@@ -10,6 +47,18 @@ class YOLOManager:
         """
         Train the model.
         config: dict with keys: project_name, model_name, version, train_images, ...
+        If config['stages'] is a non-empty list, a multi-stage schedule is run instead
+        (see _train_staged).
+        """
+        if config.get('stages'):
+            return self._train_staged(config, progress_callback, log_callback)
+        return self._train_single(config, progress_callback, log_callback)
+
+    def _train_single(self, config, progress_callback=None, log_callback=None, weights=None,
+                      extra_args=None, export=True):
+        """
+        One ultralytics training run. weights overrides the pretrained base model and
+        extra_args are passed to model.train on top of the config.
         """
         project_name = config.get('project_name', 'yolo_project')
         model_name = config.get('model_name', 'my_model')
@@ -34,30 +83,45 @@ class YOLOManager:
         fliplr = config.get('fliplr', 0.5)
         mosaic = config.get('mosaic', 1.0)
 
-        # Map device string to YOLO format
-        device = None
-        if device_str == 'CPU':
-            device = 'cpu'
-        elif device_str == 'GPU (CUDA)':
-            device = '0'
-        elif device_str == 'GPU (MPS)':
-            device = 'mps'
-        # 'Auto' remains None
-
-        # Determine base model
-        if version == 'YOLOv8':
-            base_model = 'yolov8n.pt'
-        elif version == 'YOLOv11':
-            base_model = 'yolo11n.pt'
-        elif version == 'YOLOv5':
-            base_model = 'yolov5nu.pt' # Ultralytics supports v5 models
-        else:
-            base_model = 'yolov8n.pt'
+        # Checkpointing & resume
+        resume = config.get('resume', True)
+        save_period = config.get('save_period', -1)
 
-        if log_callback:
-            log_callback(f"Initializing {version} model: {base_model}...")
-        
-        self.model = YOLO(base_model)
+        # Multi-process CPU training
+        processes = config.get('processes', 1) if device_str == CPU_DISTRIBUTED else 1
+        if processes > 1:
+            from core.distributed import available_cores
+
+            # One rank per core at most; a single rank trains in this process
+            cores = len(available_cores())
+            if processes > cores:
+                if log_callback:
+                    log_callback(f"Requested {processes} training processes but only {cores} CPU core(s) "
+                                 f"available, using {max(1, cores)}")
+                processes = cores
+
+        device = map_device(device_str)
+        base_model = weights or base_model_for(version)
+
+        # Resume an interrupted run of the same config if possible
+        save_dir = run_save_dir(project_name, model_name)
+        fingerprint = training_fingerprint(config)
+        resume_ckpt = None
+        if resume:
+            resume_ckpt, reason = find_resume_checkpoint(save_dir, fingerprint)
+            if log_callback:
+                log_callback(reason)
+        if not resume_ckpt and discard_checkpoint(save_dir) and log_callback:
+            log_callback(f"Removed the previous run's checkpoint from {save_dir}")
+
+        with profiling.span("model_load"):
+            if resume_ckpt:
+                self.model = YOLO(str(resume_ckpt))
+            else:
+                if log_callback:
+                    log_callback(f"Initializing {version} model: {base_model}...")
+                self.model = YOLO(base_model)
+        write_state(save_dir, fingerprint, completed=False)
 
         # Attach progress callback
         if progress_callback:
@@ -69,14 +133,18 @@ class YOLOManager:
             
             self.model.add_callback("on_train_epoch_end", on_train_epoch_end)
 
+        if profiling.is_enabled():
+            self._add_profiling_callbacks(self.model)
+
         if log_callback:
             log_callback(f"Starting training for {epochs} epochs...")
             log_callback(f"Device: {device_str}, Workers: {workers}, Opt: {optimizer}, Patience: {patience}")
             log_callback(f"LR0: {lr0}, CosLR: {cos_lr}, Rect: {rect}, Cache: {cache}")
             log_callback(f"Augmentation - Degrees: {degrees}, FlipLR: {fliplr}, Mosaic: {mosaic}")
+            if save_period > 0:
+                log_callback(f"Saving checkpoint every {save_period} epochs")
 
-        # Train
-        results = self.model.train(
+        train_args = dict(
             data=data_yaml,
             epochs=epochs,
             batch=batch,
@@ -92,74 +160,436 @@ class YOLOManager:
             degrees=degrees,
             fliplr=fliplr,
             mosaic=mosaic,
+            save_period=save_period,
+            resume=str(resume_ckpt) if resume_ckpt else False,
             project=project_name,
             name=model_name,
             exist_ok=True, # Overwrite existing project/name
             verbose=True
         )
+        train_args.update(extra_args or {})
+
+        # Train
+        train_span = profiling.span("train").start()
+        if processes > 1:
+            from core.distributed import train_distributed
+
+            result_dir = train_distributed(
+                str(resume_ckpt) if resume_ckpt else base_model, train_args, processes, save_dir,
+                progress_callback=progress_callback, log_callback=log_callback
+            )
+            # Export the best weights, as ultralytics does after single-process training
+            weights = os.path.join(result_dir, 'weights')
+            best = os.path.join(weights, 'best.pt')
+            self.model = YOLO(best if os.path.exists(best) else os.path.join(weights, 'last.pt'))
+        else:
+            result_dir = self.model.train(**train_args).save_dir
+        train_span.stop()
+        write_state(save_dir, fingerprint, completed=True)
 
         if log_callback:
             log_callback("Training finished.")
-            log_callback(f"Results saved to {results.save_dir}")
+            log_callback(f"Results saved to {result_dir}")
 
         # Export to ONNX
+        if export:
+            self._export_onnx(log_callback)
+        
+        return result_dir
+
+    def _export_onnx(self, log_callback=None):
         if log_callback:
             log_callback("Exporting to ONNX...")
-        self.model.export(format='onnx')
-        
-        return results.save_dir
+        with profiling.span("export"):
+            self.model.export(format='onnx')
 
-    def predict(self, model_path, image_folder, use_gray=False):
+    def _train_staged(self, config, progress_callback=None, log_callback=None):
         """
-        Run inference on a folder of images.
+        Progressive-resolution schedule: config['stages'] is a list of
+        {'epochs', 'imgsz', 'fraction'} dicts. Every stage trains in its own
+        stage<N> subfolder of the run, starting from the previous stage's last.pt,
+        so early epochs can run at a lower resolution and/or on a data subset.
+        The stages are reported as one run: results.csv and the final weights are
+        combined into the run folder.
+
+        With resume enabled, stages that already finished with the same config are
+        skipped and an interrupted stage is resumed.
         """
-        model = YOLO(model_path)
-        
-        # Get list of images
-        valid_exts = ['.jpg', '.jpeg', '.png', '.bmp']
-        images = [os.path.join(image_folder, f) for f in os.listdir(image_folder) 
-                  if os.path.splitext(f)[1].lower() in valid_exts]
-        
-        results_data = []
-        
-        import cv2
-        import numpy as np
-
-        for img_path in images:
-            # Prepare source
-            if use_gray:
-                # Read as gray, convert to BGR (YOLO expects 3 channels)
-                img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-                if img is None: continue
-                source = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        project_name = config.get('project_name', 'yolo_project')
+        model_name = config.get('model_name', 'my_model')
+        stages = config['stages']
+        total_epochs = sum(stage['epochs'] for stage in stages)
+        run_dir = run_save_dir(project_name, model_name)
+
+        if log_callback:
+            plan = ", ".join(
+                f"{s['epochs']} epochs @ {s['imgsz']}" + (f" ({s['fraction']:.0%} data)" if s.get('fraction', 1.0) < 1 else "")
+                for s in stages
+            )
+            log_callback(f"Staged training, {total_epochs} epochs in {len(stages)} stages: {plan}")
+
+        weights = None
+        epochs_done = 0
+        upstream_changed = False # Once a stage is retrained, all later stages must be too
+        stage_dirs = []
+        for k, stage in enumerate(stages):
+            stage_config = dict(
+                config,
+                stages=None,
+                model_name=f"{model_name}/stage{k + 1}",
+                epochs=stage['epochs'],
+                imgsz=stage['imgsz'],
+                stage={'index': k, 'fraction': stage.get('fraction', 1.0), 'weights': weights},
+            )
+            stage_dir = run_save_dir(project_name, stage_config['model_name'])
+            stage_dirs.append(stage_dir)
+
+            state = read_state(stage_dir)
+            if (config.get('resume', True) and not upstream_changed and state and state.get('completed')
+                    and state.get('fingerprint') == training_fingerprint(stage_config)
+                    and (stage_dir / 'weights' / 'last.pt').exists()):
+                if log_callback:
+                    log_callback(f"Stage {k + 1}/{len(stages)} already finished, skipping.")
+                if progress_callback:
+                    progress_callback(int((epochs_done + stage['epochs']) / total_epochs * 100))
             else:
-                source = img_path
+                if log_callback:
+                    log_callback(f"Stage {k + 1}/{len(stages)}: {stage['epochs']} epochs at imgsz {stage['imgsz']}")
+                stage_config['resume'] = config.get('resume', True) and not upstream_changed
+                upstream_changed = True
+                # A subset stage overwrites ultralytics' label cache with the subset's hash;
+                # put the full-dataset cache back so the next stage does not rescan
+                restore_label_caches(config['data_yaml'], log_callback)
 
-            # Run prediction
-            # stream=False for single image processing loop to handle custom source
-            results = model.predict(source, verbose=False)
-            
-            for res in results:
-                # Process result
-                boxes = res.boxes
-                
-                detections = []
-                for box in boxes:
-                    # x1, y1, x2, y2
-                    coords = box.xyxy[0].tolist()
-                    conf = float(box.conf[0])
-                    cls_id = int(box.cls[0])
-                    # Handle ONNX model names (sometimes missing or dict)
-                    if hasattr(model, 'names') and model.names:
-                        cls_name = model.names[cls_id]
-                    else:
-                        cls_name = str(cls_id)
-                    
-                    detections.append(coords + [conf, cls_name])
-                
-                results_data.append({
-                    'image_path': img_path, # Keep original path for display
-                    'detections': detections
-                })
-            
+                def stage_progress(percent, offset=epochs_done, epochs=stage['epochs']):
+                    if progress_callback:
+                        progress_callback(int((offset + percent / 100 * epochs) / total_epochs * 100))
+
+                extra_args = {'fraction': stage.get('fraction', 1.0)}
+                if k > 0:
+                    extra_args['warmup_epochs'] = 0 # Weights are already trained; no need to warm up again
+                stage_dir = Path(self._train_single(stage_config, stage_progress, log_callback,
+                                                    weights=weights, extra_args=extra_args, export=False))
+                stage_dirs[-1] = stage_dir
+
+            weights = str(stage_dir / 'weights' / 'last.pt')
+            epochs_done += stage['epochs']
+
+        combine_stage_results(stage_dirs, stages, run_dir)
+        final_weights = stage_dirs[-1] / 'weights'
+        (run_dir / 'weights').mkdir(parents=True, exist_ok=True)
+        for name in ('best.pt', 'last.pt'):
+            if (final_weights / name).exists():
+                shutil.copy2(final_weights / name, run_dir / 'weights' / name)
+        if log_callback:
+            log_callback(f"Staged training finished. Combined results saved to {run_dir}")
+
+        best = run_dir / 'weights' / 'best.pt'
+        self.model = YOLO(str(best if best.exists() else run_dir / 'weights' / 'last.pt'))
+        self._export_onnx(log_callback)
+        return run_dir
+
+    @staticmethod
+    def _add_profiling_callbacks(model):
+        """Times dataloading, train steps, epochs and validation via trainer callbacks."""
+        spans = {}
+        last_batch_end = [None]
+
+        def begin(name):
+            def callback(trainer):
+                spans[name] = profiling.span(name).start()
+                if name == "train_batch" and last_batch_end[0] is not None:
+                    # Time between two steps is spent waiting for the dataloader
+                    profiling.record("dataload", last_batch_end[0], time.perf_counter_ns())
+            return callback
+
+        def end(name):
+            def callback(trainer):
+                if name in spans:
+                    spans.pop(name).stop()
+                if name == "train_batch":
+                    last_batch_end[0] = time.perf_counter_ns()
+                elif name == "train_epoch":
+                    last_batch_end[0] = None
+            return callback
+
+        for name, start_event, end_event in (
+            ("pretrain", "on_pretrain_routine_start", "on_pretrain_routine_end"),
+            ("train_epoch", "on_train_epoch_start", "on_train_epoch_end"),
+            ("train_batch", "on_train_batch_start", "on_train_batch_end"),
+            ("val", "on_val_start", "on_val_end"),
+        ):
+            model.add_callback(start_event, begin(name))
+            model.add_callback(end_event, end(name))
+
+    def predict(self, model_path, image_folder, use_gray=False, store=None, recursive=False):
+        """
+        Run inference on a folder of images (including subfolders if recursive).
+        If a ResultStore is given, images already processed with the same model and
+        options are read from the store instead of being run through the model.
+        """
+        results_data = []
+        for res in self._predict_models([model_path], image_folder, use_gray, store, recursive):
+            results_data.append({
+                'image_path': res['image_path'], # Keep original path for display
+                'rel_path': res['rel_path'],
+                'image_size': res['image_size'],
+                'detections': res['models'][0]
+            })
+        return results_data
+
+    def predict_compare(self, model_paths, image_folder, use_gray=False, store=None, recursive=False):
+        """
+        Run several models on the same images; every image is read and decoded once
+        and shared by all models, which run concurrently.
+
+        Returns:
+            list: Per image: image_path, image_size, 'detections' of the first model,
+                'models' {label: detections}, 'disagreements' {label: [bool per box]}
+                and 'has_disagreement'.
+        """
+        from core.evaluation import find_disagreements
+
+        labels = model_labels(model_paths)
+        results_data = []
+        for res in self._predict_models(model_paths, image_folder, use_gray, store, recursive):
+            models = dict(zip(labels, res['models']))
+            disagreements = find_disagreements(models)
+            results_data.append({
+                'image_path': res['image_path'],
+                'rel_path': res['rel_path'],
+                'image_size': res['image_size'],
+                'detections': res['models'][0],
+                'models': models,
+                'disagreements': disagreements,
+                'has_disagreement': any(any(flags) for flags in disagreements.values())
+            })
         return results_data
+
+    @staticmethod
+    def load_model(model_path):
+        with profiling.span("model_load", model=model_path):
+            return YOLO(model_path)
+
+    @staticmethod
+    def predict_arrays(model, model_path, arrays):
+        """
+        Run a loaded model on decoded BGR images.
+
+        Returns:
+            list: (detections, (width, height)) per image, see extract_detections.
+        """
+        begin = time.perf_counter_ns()
+        if model_path.endswith('.pt'):
+            results = model.predict(arrays, verbose=False)
+        else:
+            # Static-shape exports (e.g. ONNX with batch 1) are fed one image at a time
+            results = [r for arr in arrays for r in model.predict(arr, verbose=False)]
+        if profiling.is_enabled():
+            # ultralytics reports per-image stage times; lay them out as one
+            # preprocess -> forward -> postprocess sequence for this call
+            totals = {k: sum(r.speed[k] for r in results if r.speed) for k in ('preprocess', 'inference', 'postprocess')}
+            profiling.record_sequence(begin, [('preprocess', totals['preprocess']),
+                                              ('forward', totals['inference']),
+                                              ('postprocess', totals['postprocess'])])
+        # Moves boxes from the model device into Python lists
+        with profiling.span("copy", images=len(results)):
+            return [extract_detections(model, res) for res in results]
+
+    def _predict_models(self, model_paths, image_folder, use_gray, store, recursive=False):
+        """
+        Shared inference loop. Images are streamed from the folder in batches: discovery,
+        file reads and hashing of the next batch are prefetched, decoding is parallel,
+        and each model runs on its own thread over the decoded batch.
+        """
+        # Images are discovered lazily, so the first batch starts before the tree is listed
+        images = iter_images(image_folder, self.IMAGE_EXTENSIONS, recursive=recursive,
+                             workers=self.DISCOVERY_WORKERS if recursive else None)
+
+        options = {'use_gray': use_gray}
+        # Models are loaded lazily so fully cached runs never touch them
+        models = [None] * len(model_paths)
+        if store is not None:
+            model_hashes = [hash_file(p) for p in model_paths]
+            run_ids = [store.begin_run(p, image_folder, options) for p in model_paths]
+
+        def read_batch():
+            """Next batch of (path, rel_path, data, hash); None once discovery is exhausted."""
+            with profiling.span("discovery"):
+                paths = list(islice(images, self.PREDICT_BATCH))
+            if not paths:
+                return None
+            items = []
+            with profiling.span("read", images=len(paths)):
+                for img_path, rel_path in paths:
+                    try:
+                        with open(img_path, 'rb') as f:
+                            data = f.read()
+                    except OSError:
+                        continue # Vanished or unreadable since discovery; skipped like undecodable images
+                    items.append((img_path, rel_path, data, hash_bytes(data) if store is not None else None))
+            return items
+
+        def decode(j):
+            with profiling.span("decode"):
+                return decode_image(items[j][2], use_gray)
+
+        def run_model(i, arrays):
+            if models[i] is None:
+                models[i] = self.load_model(model_paths[i])
+            return self.predict_arrays(models[i], model_paths[i], arrays)
+
+        # Pool threads record into the profile of the calling run
+        read_batch, decode, run_model = map(profiling.bind, (read_batch, decode, run_model))
+
+        results_data = []
+        io_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+        model_pool = ThreadPoolExecutor(max_workers=len(model_paths))
+        try:
+            pending = io_pool.submit(read_batch)
+            while True:
+                items = pending.result()
+                if items is None:
+                    break
+                pending = io_pool.submit(read_batch)
+
+                # outputs[j][i] = (detections, image_size) of image j for model i
+                outputs = [[None] * len(model_paths) for _ in items]
+                keys = [[None] * len(model_paths) for _ in items]
+                if store is not None:
+                    lookup_span = profiling.span("cache_lookup").start()
+                    for j, (_, _, _, image_hash) in enumerate(items):
+                        for i in range(len(model_paths)):
+                            keys[j][i] = make_result_key(image_hash, model_hashes[i], options)
+                            cached = store.get(keys[j][i])
+                            if cached is not None:
+                                outputs[j][i] = (cached['detections'], cached['image_size'])
+                    lookup_span.stop()
+
+                # Decode each image once for all models that still need it
+                to_decode = [j for j in range(len(items)) if None in outputs[j]]
+                decoded = dict(zip(to_decode, io_pool.map(decode, to_decode)))
+                to_decode = [j for j in to_decode if decoded[j] is not None]
+
+                futures = {}
+                for i in range(len(model_paths)):
+                    todo = [j for j in to_decode if outputs[j][i] is None]
+                    if todo:
+                        futures[i] = (todo, model_pool.submit(run_model, i, [decoded[j] for j in todo]))
+                for i, (todo, future) in futures.items():
+                    for j, (detections, image_size) in zip(todo, future.result()):
+                        outputs[j][i] = (detections, image_size)
+                        if store is not None:
+                            with profiling.span("store_write"):
+                                store.put(keys[j][i], items[j][3], model_hashes[i], options,
+                                          image_size, detections)
+
+                for j, (img_path, rel_path, _, _) in enumerate(items):
+                    if None in outputs[j]:
+                        continue # Unreadable image
+                    if store is not None:
+                        for i in range(len(model_paths)):
+                            store.add_to_run(run_ids[i], img_path, keys[j][i])
+                    results_data.append({
+                        'image_path': img_path,
+                        'rel_path': rel_path,
+                        'image_size': outputs[j][0][1],
+                        'models': [dets for dets, _ in outputs[j]]
+                    })
+        finally:
+            io_pool.shutdown()
+            model_pool.shutdown()
+            images.close() # Stops discovery threads if the loop ended early
+
+        if store is not None:
+            store.commit()
+
+        # Parallel discovery yields subfolders interleaved
+        results_data.sort(key=lambda r: r['rel_path'])
+        return results_data
+
+def combine_stage_results(stage_dirs, stages, run_dir):
+    """
+    Concatenates the results.csv of every stage into run_dir/results.csv with
+    continuous epoch numbers plus 'stage' and 'imgsz' columns.
+    """
+    import csv
+
+    rows, fields = [], []
+    offset = 0
+    for k, (stage_dir, stage) in enumerate(zip(stage_dirs, stages)):
+        path = Path(stage_dir) / 'results.csv'
+        # A stage stopped early by patience writes fewer epochs than configured
+        last_epoch = stage['epochs']
+        if path.exists():
+            last_epoch = 0
+            with open(path, newline='') as f:
+                for row in csv.DictReader(f):
+                    row = {key.strip(): value.strip() for key, value in row.items()}
+                    epoch = int(float(row.get('epoch', 0)))
+                    last_epoch = max(last_epoch, epoch)
+                    row['epoch'] = str(offset + epoch)
+                    rows.append({'stage': str(k + 1), 'imgsz': str(stage['imgsz']), **row})
+                    fields += [key for key in rows[-1] if key not in fields]
+        offset += last_epoch
+
+    if not rows:
+        return None
+    out = Path(run_dir) / 'results.csv'
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return out
+
+def model_labels(model_paths):
+    """Short unique display names for a list of model paths."""
+    labels = []
+    for path in model_paths:
+        label = os.path.basename(path)
+        if label in labels:
+            label = f"{label} ({len(labels) + 1})"
+        labels.append(label)
+    return labels
+
+def decode_image(data, use_gray=False):
+    """Decode image bytes into a BGR array (None if unreadable)."""
+    import cv2
+    import numpy as np
+
+    if not data:
+        return None # imdecode asserts on an empty buffer (e.g. a 0-byte file)
+    buf = np.frombuffer(data, dtype=np.uint8)
+    try:
+        if use_gray:
+            # Read as gray, convert to BGR (YOLO expects 3 channels)
+            img = cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                return None
+            return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    except cv2.error:
+        return None
+
+def extract_detections(model, res):
+    """
+    Convert one ultralytics result into ([x1, y1, x2, y2, conf, cls_name, cls_id], ...)
+    and the original (width, height).
+    """
+    detections = []
+    for box in res.boxes:
+        # x1, y1, x2, y2
+        coords = box.xyxy[0].tolist()
+        conf = float(box.conf[0])
+        cls_id = int(box.cls[0])
+        # Handle ONNX model names (sometimes missing or dict)
+        if hasattr(model, 'names') and model.names:
+            cls_name = model.names[cls_id]
+        else:
+            cls_name = str(cls_id)
+
+        detections.append(coords + [conf, cls_name, cls_id])
+
+    height, width = res.orig_shape[:2]
+    return detections, (width, height)
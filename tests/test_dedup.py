@@ -0,0 +1,55 @@
+"""The band index used above BRUTE_FORCE_LIMIT must find exactly the brute-force pairs."""
+import numpy as np
+import pytest
+
+from core import dedup
+
+
+def _clustered_hashes(n=7500, n_clusters=1500, max_flips=4, seed=0):
+    """Random cluster centres plus copies with a few flipped bits (and exact repeats)."""
+    rng = np.random.default_rng(seed)
+    centres = rng.integers(0, 2 ** 63, size=n_clusters, dtype=np.int64).astype(np.uint64) << np.uint64(1)
+    hashes = centres[rng.integers(0, n_clusters, n)]
+    for _ in range(max_flips):
+        flip = np.uint64(1) << rng.integers(0, 64, n).astype(np.uint64)
+        hashes = np.where(rng.random(n) < 0.5, hashes ^ flip, hashes)
+    return hashes
+
+
+def _unique_pairs(chunks):
+    pairs = {(int(i), int(j)) for a, b in chunks for i, j in zip(a, b)}
+    assert all(i < j for i, j in pairs)
+    return pairs
+
+
+def _partition(labels):
+    """Cluster labels as a set of frozensets, independent of the label values."""
+    groups = {}
+    for index, label in enumerate(labels):
+        groups.setdefault(label, set()).add(index)
+    return {frozenset(g) for g in groups.values()}
+
+
+@pytest.fixture(scope='module')
+def hashes():
+    return _clustered_hashes()
+
+
+@pytest.mark.parametrize('threshold', range(dedup.MAX_THRESHOLD + 1))
+def test_band_index_matches_brute_force(hashes, threshold):
+    expected = _unique_pairs(dedup._pairs_brute_force(hashes, threshold))
+    assert _unique_pairs(dedup._pairs_band_index(hashes, threshold)) == expected
+
+
+@pytest.mark.parametrize('threshold', [0, 3, 6, dedup.MAX_THRESHOLD])
+def test_clusters_match_brute_force(hashes, threshold, monkeypatch):
+    expected = _partition(dedup.find_clusters(hashes, threshold))
+    # Force the band index for the same data
+    monkeypatch.setattr(dedup, 'BRUTE_FORCE_LIMIT', 100)
+    assert _partition(dedup.find_clusters(hashes, threshold)) == expected
+
+
+def test_band_index_rejects_loose_threshold(hashes, monkeypatch):
+    monkeypatch.setattr(dedup, 'BRUTE_FORCE_LIMIT', 100)
+    with pytest.raises(ValueError):
+        dedup.find_clusters(hashes, dedup.MAX_THRESHOLD + 1)
@@ -0,0 +1,84 @@
+"""Regression check of core.evaluation against ultralytics' own validation metrics."""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core.evaluation import IOU_THRESHOLDS, box_iou, evaluate
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+
+WIDTH, HEIGHT = 640, 480
+NAMES = ['a', 'b', 'c']
+
+
+def _make_fixture(tmp_path, n_images=60, seed=0):
+    """Random ground truth on a grid (no overlapping boxes) plus jittered, missed and spurious predictions."""
+    rng = np.random.default_rng(seed)
+    label_folder = tmp_path / 'labels'
+    label_folder.mkdir()
+    results = []
+    for i in range(n_images):
+        cells = rng.choice(12, size=rng.integers(0, 6), replace=False)
+        gt = []
+        for cell in cells:
+            x0, y0 = (cell % 4) * 160, (cell // 4) * 160
+            w, h = rng.uniform(40, 140, size=2)
+            gt.append((int(rng.integers(3)), x0 + 10, y0 + 10, x0 + 10 + w, y0 + 10 + h))
+        with open(label_folder / f"img{i}.txt", 'w') as f:
+            for c, x1, y1, x2, y2 in gt:
+                f.write(f"{c} {(x1 + x2) / 2 / WIDTH} {(y1 + y2) / 2 / HEIGHT} "
+                        f"{(x2 - x1) / WIDTH} {(y2 - y1) / HEIGHT}\n")
+
+        dets = []
+        for c, x1, y1, x2, y2 in gt:
+            if rng.random() < 0.2:
+                continue # Missed object
+            jitter = rng.normal(0, 8, size=4)
+            cls = c if rng.random() < 0.9 else int(rng.integers(3))
+            dets.append([x1 + jitter[0], y1 + jitter[1], x2 + jitter[2], y2 + jitter[3],
+                         float(rng.uniform(0.05, 1.0)), NAMES[cls], cls])
+        for _ in range(rng.integers(0, 3)): # Spurious boxes
+            x1, y1 = rng.uniform(0, 500), rng.uniform(0, 350)
+            cls = int(rng.integers(3))
+            dets.append([x1, y1, x1 + 60, y1 + 60, float(rng.uniform(0.05, 0.6)), NAMES[cls], cls])
+        results.append({'image_path': str(tmp_path / f"img{i}.jpg"), 'rel_path': f"img{i}.jpg",
+                        'image_size': (WIDTH, HEIGHT), 'detections': dets, 'gt': gt})
+    return results, label_folder
+
+
+def _ultralytics_metrics(results):
+    from ultralytics.engine.validator import BaseValidator
+    from ultralytics.utils.metrics import ap_per_class
+
+    validator = SimpleNamespace(iouv=torch.tensor(IOU_THRESHOLDS))
+    tps, confs, pred_classes, target_classes = [], [], [], []
+    for res in results:
+        gt = np.array(res['gt'], dtype=np.float64).reshape(-1, 5)
+        dets = sorted(res['detections'], key=lambda d: -d[4])
+        pred_cls = np.array([d[6] for d in dets], dtype=np.int64)
+        conf = np.array([d[4] for d in dets])
+        if len(gt) and len(dets):
+            iou = box_iou(gt[:, 1:], np.array([d[:4] for d in dets]))
+            correct = BaseValidator.match_predictions(
+                validator, torch.from_numpy(pred_cls), torch.from_numpy(gt[:, 0].astype(np.int64)),
+                torch.from_numpy(iou)).numpy()
+        else:
+            correct = np.zeros((len(dets), len(IOU_THRESHOLDS)), dtype=bool)
+        tps.append(correct)
+        confs.append(conf)
+        pred_classes.append(pred_cls)
+        target_classes.append(gt[:, 0].astype(np.int64))
+
+    ap = ap_per_class(np.concatenate(tps), np.concatenate(confs), np.concatenate(pred_classes),
+                      np.concatenate(target_classes))[5]
+    return ap[:, 0].mean(), ap.mean()
+
+
+def test_map_matches_ultralytics(tmp_path):
+    results, label_folder = _make_fixture(tmp_path)
+    metrics = evaluate(results, str(label_folder), class_names=NAMES)
+    map50, map50_95 = _ultralytics_metrics(results)
+    assert metrics['map50'] == pytest.approx(map50, abs=1e-6)
+    assert metrics['map'] == pytest.approx(map50_95, abs=1e-6)
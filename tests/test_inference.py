@@ -0,0 +1,74 @@
+"""Inference must skip unreadable images instead of failing the whole run."""
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("ultralytics")
+
+from core.yolo_engine import YOLOManager, decode_image
+
+# Weights used by the tests; ultralytics cannot download them offline
+MODEL = os.environ.get('YOLO_TEST_MODEL', 'yolov8n.pt')
+
+
+def _model_path():
+    for candidate in (Path(MODEL), Path(__file__).resolve().parent.parent / MODEL):
+        if candidate.exists():
+            return str(candidate)
+    pytest.skip(f"{MODEL} is not available (set YOLO_TEST_MODEL)")
+
+
+def _image_folder(folder):
+    folder.mkdir()
+    for i in range(2):
+        img = np.random.default_rng(i).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+        cv2.imwrite(str(folder / f"img{i}.jpg"), img)
+    (folder / 'empty.jpg').write_bytes(b'')
+    (folder / 'garbage.jpg').write_bytes(b'not an image')
+    return folder
+
+
+@pytest.mark.parametrize('use_gray', [False, True])
+def test_decode_image_rejects_empty_and_corrupt_data(use_gray):
+    assert decode_image(b'', use_gray) is None
+    assert decode_image(b'not an image', use_gray) is None
+
+
+@pytest.mark.parametrize('use_gray', [False, True])
+@pytest.mark.parametrize('use_store', [False, True])
+def test_predict_skips_empty_file(tmp_path, use_gray, use_store):
+    from core.result_store import ResultStore
+
+    folder = _image_folder(tmp_path / 'images')
+    store = ResultStore(str(tmp_path / 'results.db')) if use_store else None
+    try:
+        results = YOLOManager().predict(_model_path(), str(folder), use_gray, store=store)
+    finally:
+        if store is not None:
+            store.close()
+    assert [r['rel_path'] for r in results] == ['img0.jpg', 'img1.jpg']
+
+
+def test_service_rejects_empty_body():
+    from core.service import InferenceService, make_server
+
+    service = InferenceService([_model_path()])
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/predict", data=b'',
+                                         headers={'Content-Type': 'application/octet-stream'})
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(request, timeout=30)
+        assert e.value.code == 400
+        assert 'decode' in json.loads(e.value.read())['error']
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,30 +1,41 @@
 import os
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QFileDialog, QSpinBox, QDoubleSpinBox, QProgressBar, QTextEdit, QGroupBox, QFormLayout, QMessageBox
+    QFileDialog, QSpinBox, QDoubleSpinBox, QProgressBar, QTextEdit, QGroupBox, QFormLayout, QMessageBox,
+    QCheckBox, QComboBox
 )
 from PySide6.QtCore import Qt, QThread, Signal
 from core.dataset_utils import split_dataset
+from core.dedup import MAX_THRESHOLD
+from core import profiling
 
 class DatasetWorker(QThread):
     log_signal = Signal(str)
     finished_signal = Signal()
     error_signal = Signal(str)
 
-    def __init__(self, source, output, ratio):
+    def __init__(self, source, output, ratio, dedup_threshold=None, dedup_mode='group', recursive=False):
         super().__init__()
         self.source = source
         self.output = output
         self.ratio = ratio
+        self.dedup_threshold = dedup_threshold
+        self.dedup_mode = dedup_mode
+        self.recursive = recursive
 
     def run(self):
+        profiling.start_run("dataset")
         try:
             split_dataset(
                 self.source, 
                 self.output, 
                 self.ratio, 
-                lambda msg: self.log_signal.emit(msg)
+                lambda msg: self.log_signal.emit(msg),
+                dedup_threshold=self.dedup_threshold,
+                dedup_mode=self.dedup_mode,
+                recursive=self.recursive
             )
+            profiling.finish_run("dataset", log_callback=lambda msg: self.log_signal.emit(msg))
             self.finished_signal.emit()
         except Exception as e:
             self.error_signal.emit(str(e))
@@ -46,6 +57,9 @@ class DatasetTab(QWidget):
 
         self.source_edit = self.create_file_selector(config_layout, "原始資料夾 (含圖片與txt):")
         self.output_edit = self.create_file_selector(config_layout, "輸出位置:", is_save=False)
+
+        self.recursive_check = QCheckBox("包含子資料夾 (保留資料夾結構)")
+        config_layout.addRow("", self.recursive_check)
         
         self.dataset_name_edit = QLineEdit("MyDataset")
         config_layout.addRow("資料集名稱:", self.dataset_name_edit)
@@ -57,6 +71,23 @@ class DatasetTab(QWidget):
         self.ratio_spin.setPrefix("訓練集比例: ")
         config_layout.addRow("分割比例:", self.ratio_spin)
 
+        # Near-duplicate detection
+        dedup_layout = QHBoxLayout()
+        self.dedup_check = QCheckBox("啟用")
+        self.dedup_check.setToolTip("以感知雜湊 (Perceptual Hash) 找出近似重複的圖片 (例如連續影格、重複拍攝)")
+        self.dedup_threshold_spin = QSpinBox()
+        self.dedup_threshold_spin.setRange(0, MAX_THRESHOLD)
+        self.dedup_threshold_spin.setValue(5)
+        self.dedup_threshold_spin.setPrefix("相似門檻: ")
+        self.dedup_threshold_spin.setToolTip("雜湊的漢明距離上限 (0 = 幾乎完全相同，數值越大越寬鬆)")
+        self.dedup_mode_combo = QComboBox()
+        self.dedup_mode_combo.addItem("保持同群組在同一側", "group")
+        self.dedup_mode_combo.addItem("移除重複圖片", "drop")
+        dedup_layout.addWidget(self.dedup_check)
+        dedup_layout.addWidget(self.dedup_threshold_spin)
+        dedup_layout.addWidget(self.dedup_mode_combo)
+        config_layout.addRow("近似重複偵測:", dedup_layout)
+
         config_group.setLayout(config_layout)
         layout.addWidget(config_group)
 
@@ -106,7 +137,11 @@ class DatasetTab(QWidget):
         self.log_output.append(f"開始轉換... 目標: {final_output}")
         self.convert_btn.setEnabled(False)
 
-        self.worker = DatasetWorker(source, final_output, ratio)
+        dedup_threshold = self.dedup_threshold_spin.value() if self.dedup_check.isChecked() else None
+        dedup_mode = self.dedup_mode_combo.currentData()
+
+        self.worker = DatasetWorker(source, final_output, ratio, dedup_threshold, dedup_mode,
+                                    self.recursive_check.isChecked())
         self.worker.log_signal.connect(self.log_output.append)
         self.worker.finished_signal.connect(lambda: self.on_finished(final_output))
         self.worker.error_signal.connect(self.on_error)
@@ -1,18 +1,27 @@
 import os
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QFileDialog, QListWidget, QSplitter, QTextEdit, QGroupBox, QCheckBox
+    QFileDialog, QListWidget, QSplitter, QTextEdit, QGroupBox, QCheckBox, QInputDialog, QDialog,
+    QSpinBox, QProgressBar
 )
 from PySide6.QtCore import Qt, Signal
-from PySide6.QtGui import QPixmap, QImage, QPainter, QPen, QColor
+from PySide6.QtGui import QPixmap, QImage, QPainter, QPen, QColor, QFontDatabase
+from core.result_store import ResultStore
+from core.evaluation import format_report
+
+# Box colors per model in comparison mode
+MODEL_COLORS = [QColor(255, 0, 0), QColor(0, 120, 255), QColor(0, 180, 0), QColor(200, 0, 200), QColor(255, 140, 0)]
 
 class InferenceTab(QWidget):
-    inference_requested = Signal(str, str, bool) # model_path, image_folder, use_gray
+    inference_requested = Signal(str, str, bool, bool, list, bool) # model_path, image_folder, use_gray, use_cache, compare_paths, recursive
+    evaluation_requested = Signal(list, str) # results, label_folder
+    export_requested = Signal(list, str, dict) # results, output_folder, options
 
     def __init__(self):
         super().__init__()
         self.init_ui()
-        self.current_results = {} # Store results: {filename: {image: path, detections: []}}
+        self.current_results = {} # Store results: {relative path: {image: path, detections: []}}
+        self.model_checks = {} # Comparison mode: {model label: QCheckBox}
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -32,6 +41,17 @@ class InferenceTab(QWidget):
         model_layout.addWidget(model_btn)
         config_layout.addLayout(model_layout)
 
+        # Comparison Models
+        compare_layout = QHBoxLayout()
+        self.compare_paths_edit = QLineEdit()
+        self.compare_paths_edit.setPlaceholderText("選擇其他模型以進行比較 (選填，多個以 ; 分隔)")
+        compare_btn = QPushButton("選擇模型")
+        compare_btn.clicked.connect(self.browse_compare_models)
+        compare_layout.addWidget(QLabel("比較模型:"))
+        compare_layout.addWidget(self.compare_paths_edit)
+        compare_layout.addWidget(compare_btn)
+        config_layout.addLayout(compare_layout)
+
         # Image Folder Selection
         folder_layout = QHBoxLayout()
         self.image_folder_edit = QLineEdit()
@@ -43,17 +63,84 @@ class InferenceTab(QWidget):
         folder_layout.addWidget(folder_btn)
         config_layout.addLayout(folder_layout)
 
+        # Label Folder Selection (for evaluation)
+        label_layout = QHBoxLayout()
+        self.label_folder_edit = QLineEdit()
+        self.label_folder_edit.setPlaceholderText("選擇 YOLO 標籤資料夾 (評估用，選填)")
+        label_btn = QPushButton("選擇標籤")
+        label_btn.clicked.connect(self.browse_label_folder)
+        label_layout.addWidget(QLabel("標籤資料夾:"))
+        label_layout.addWidget(self.label_folder_edit)
+        label_layout.addWidget(label_btn)
+        config_layout.addLayout(label_layout)
+
+        run_layout = QHBoxLayout()
         self.run_btn = QPushButton("執行推論")
         self.run_btn.clicked.connect(self.on_run_clicked)
-        config_layout.addWidget(self.run_btn)
+        self.history_btn = QPushButton("開啟歷史結果")
+        self.history_btn.clicked.connect(self.on_history_clicked)
+        run_layout.addWidget(self.run_btn)
+        run_layout.addWidget(self.history_btn)
+        self.eval_btn = QPushButton("評估 (mAP)")
+        self.eval_btn.clicked.connect(self.on_eval_clicked)
+        run_layout.addWidget(self.eval_btn)
+        config_layout.addLayout(run_layout)
 
         # Options
         self.gray_check = QCheckBox("轉為灰階 (Convert to Grayscale)")
         config_layout.addWidget(self.gray_check)
 
+        self.recursive_check = QCheckBox("包含子資料夾")
+        config_layout.addWidget(self.recursive_check)
+
+        self.cache_check = QCheckBox("使用結果快取 (略過未變更的圖片)")
+        self.cache_check.setChecked(True)
+        config_layout.addWidget(self.cache_check)
+
+        # Export
+        export_layout = QHBoxLayout()
+        self.export_images_check = QCheckBox("標註圖片")
+        self.export_images_check.setChecked(True)
+        self.export_labels_check = QCheckBox("標籤 (.txt)")
+        self.export_labels_check.setChecked(True)
+        self.export_labels_check.setToolTip("YOLO 格式的預測標籤 (含信心度)，可用於 Pseudo-Labeling")
+        self.jpeg_quality_spin = QSpinBox()
+        self.jpeg_quality_spin.setRange(1, 100)
+        self.jpeg_quality_spin.setValue(90)
+        self.jpeg_quality_spin.setPrefix("JPEG 品質: ")
+        self.max_size_spin = QSpinBox()
+        self.max_size_spin.setRange(0, 8192)
+        self.max_size_spin.setSingleStep(64)
+        self.max_size_spin.setValue(0)
+        self.max_size_spin.setPrefix("最大邊長: ")
+        self.max_size_spin.setSpecialValueText("最大邊長: 原尺寸")
+        self.export_btn = QPushButton("匯出結果")
+        self.export_btn.clicked.connect(self.on_export_clicked)
+        self.export_progress = QProgressBar()
+        self.export_progress.setValue(0)
+        export_layout.addWidget(QLabel("匯出:"))
+        export_layout.addWidget(self.export_images_check)
+        export_layout.addWidget(self.export_labels_check)
+        export_layout.addWidget(self.jpeg_quality_spin)
+        export_layout.addWidget(self.max_size_spin)
+        export_layout.addWidget(self.export_btn)
+        export_layout.addWidget(self.export_progress)
+        config_layout.addLayout(export_layout)
+
         config_group.setLayout(config_layout)
         layout.addWidget(config_group)
 
+        # Model toggles (comparison mode)
+        self.toggle_widget = QWidget()
+        self.toggle_layout = QHBoxLayout(self.toggle_widget)
+        self.toggle_layout.setContentsMargins(0, 0, 0, 0)
+        self.diff_check = QCheckBox("標示差異")
+        self.diff_check.setChecked(True)
+        self.diff_check.setToolTip("以虛線粗框標示其他模型沒有偵測到的框")
+        self.diff_check.toggled.connect(self.refresh_current)
+        self.toggle_widget.setVisible(False)
+        layout.addWidget(self.toggle_widget)
+
         # Results Viewer
         splitter = QSplitter(Qt.Horizontal)
 
@@ -83,35 +170,101 @@ class InferenceTab(QWidget):
         if file_path:
             self.model_path_edit.setText(file_path)
 
+    def browse_compare_models(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "選擇比較模型", "", "Model Files (*.pt *.onnx)")
+        if file_paths:
+            self.compare_paths_edit.setText("; ".join(file_paths))
+
     def browse_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "選擇圖片資料夾")
         if folder:
             self.image_folder_edit.setText(folder)
 
+    def browse_label_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "選擇標籤資料夾")
+        if folder:
+            self.label_folder_edit.setText(folder)
+
     def on_run_clicked(self):
         model_path = self.model_path_edit.text()
         img_folder = self.image_folder_edit.text()
         use_gray = self.gray_check.isChecked()
+        use_cache = self.cache_check.isChecked()
+        recursive = self.recursive_check.isChecked()
+        compare_paths = [p.strip() for p in self.compare_paths_edit.text().split(';') if p.strip()]
 
         if model_path and img_folder:
             self.run_btn.setEnabled(False)
             self.file_list.clear()
             self.current_results = {}
-            self.inference_requested.emit(model_path, img_folder, use_gray)
+            self.inference_requested.emit(model_path, img_folder, use_gray, use_cache, compare_paths, recursive)
         else:
             self.details_text.setText("請選擇模型和圖片資料夾。")
 
+    def on_history_clicked(self):
+        with ResultStore() as store:
+            runs = store.list_runs()
+            if not runs:
+                self.details_text.setText("尚無歷史結果。")
+                return
+
+            labels = [
+                f"#{r['id']} {os.path.basename(r['model_path'])} | {r['image_folder']} "
+                f"({r['image_count']} 張{', 灰階' if r['options'].get('use_gray') else ''})"
+                for r in runs
+            ]
+            label, ok = QInputDialog.getItem(self, "開啟歷史結果", "選擇推論紀錄:", labels, 0, False)
+            if not ok:
+                return
+            run = runs[labels.index(label)]
+            results = store.load_run(run['id'])
+
+        self.model_path_edit.setText(run['model_path'])
+        self.image_folder_edit.setText(run['image_folder'])
+        self.gray_check.setChecked(run['options'].get('use_gray', False))
+        self.file_list.clear()
+        self.current_results = {}
+        self.update_results(results)
+
     def update_results(self, results):
         # results is a list of dicts: {'file': path, 'detections': [...], 'image_path': ...}
+        # Comparison results additionally hold 'models' and 'disagreements'
+        self.set_model_toggles(list(results[0]['models']) if results and 'models' in results[0] else [])
         for res in results:
-            filename = os.path.basename(res['image_path'])
+            # Relative paths keep same-named files in different subfolders apart
+            filename = res.get('rel_path') or os.path.basename(res['image_path'])
             self.current_results[filename] = res
             self.file_list.addItem(filename)
+            if res.get('has_disagreement'):
+                self.file_list.item(self.file_list.count() - 1).setForeground(QColor(230, 120, 0))
         
         self.run_btn.setEnabled(True)
         if self.file_list.count() > 0:
             self.file_list.setCurrentRow(0)
 
+    def set_model_toggles(self, labels):
+        # Clear previous toggles (and the trailing stretch)
+        while self.toggle_layout.count():
+            widget = self.toggle_layout.takeAt(0).widget()
+            if widget is not None and widget is not self.diff_check:
+                widget.deleteLater()
+        self.model_checks = {}
+
+        for i, label in enumerate(labels):
+            check = QCheckBox(label)
+            check.setChecked(True)
+            color = MODEL_COLORS[i % len(MODEL_COLORS)]
+            check.setStyleSheet(f"color: {color.name()}; font-weight: bold;")
+            check.toggled.connect(self.refresh_current)
+            self.toggle_layout.addWidget(check)
+            self.model_checks[label] = check
+        self.toggle_layout.addWidget(self.diff_check)
+        self.toggle_layout.addStretch()
+        self.toggle_widget.setVisible(bool(labels))
+
+    def refresh_current(self):
+        self.on_file_selected(self.file_list.currentItem(), None)
+
     def on_file_selected(self, current, previous):
         if not current:
             return
@@ -133,32 +286,122 @@ class InferenceTab(QWidget):
 
         # Draw bounding boxes
         painter = QPainter(pixmap)
-        pen = QPen(QColor(255, 0, 0), 3)
-        painter.setPen(pen)
-        
-        # detections: list of [x1, y1, x2, y2, conf, class_name]
-        for det in detections:
-            x1, y1, x2, y2, conf, cls_name = det
-            w = x2 - x1
-            h = y2 - y1
-            painter.drawRect(x1, y1, w, h)
-            painter.drawText(x1, y1 - 5, f"{cls_name} {conf:.2f}")
-        
+        if 'models' in data:
+            for i, (label, dets) in enumerate(data['models'].items()):
+                check = self.model_checks.get(label)
+                if check is not None and not check.isChecked():
+                    continue
+                flags = data['disagreements'][label] if self.diff_check.isChecked() else [False] * len(dets)
+                self.draw_detections(painter, dets, MODEL_COLORS[i % len(MODEL_COLORS)], flags)
+        else:
+            self.draw_detections(painter, detections, QColor(255, 0, 0))
         painter.end()
         
         # Scale to fit label
         scaled_pixmap = pixmap.scaled(self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
         self.image_label.setPixmap(scaled_pixmap)
 
+    def draw_detections(self, painter, detections, color, highlight=None):
+        # detections: list of [x1, y1, x2, y2, conf, class_name, class_id]
+        for i, det in enumerate(detections):
+            x1, y1, x2, y2, conf, cls_name = det[:6]
+            w = x2 - x1
+            h = y2 - y1
+            if highlight and highlight[i]:
+                # Box not confirmed by the other models
+                pen = QPen(color, 5, Qt.DashLine)
+            else:
+                pen = QPen(color, 3)
+            painter.setPen(pen)
+            painter.drawRect(x1, y1, w, h)
+            painter.drawText(x1, y1 - 5, f"{cls_name} {conf:.2f}")
+
     def display_details(self, data):
+        if 'models' in data:
+            self.display_comparison_details(data)
+            return
+
         detections = data['detections']
         text = f"檔案: {os.path.basename(data['image_path'])}\n"
         text += f"偵測數量: {len(detections)}\n\n"
         
         for i, det in enumerate(detections):
-            x1, y1, x2, y2, conf, cls_name = det
+            x1, y1, x2, y2, conf, cls_name = det[:6]
             text += f"{i+1}. {cls_name}\n"
             text += f"   信心度: {conf:.2f}\n"
             text += f"   位置 (ROI): [{int(x1)}, {int(y1)}, {int(x2)}, {int(y2)}]\n\n"
             
         self.details_text.setText(text)
+
+    def display_comparison_details(self, data):
+        text = f"檔案: {os.path.basename(data['image_path'])}\n"
+        if data.get('has_disagreement'):
+            text += "模型結果不一致\n"
+        text += "\n"
+
+        for label, dets in data['models'].items():
+            flags = data['disagreements'][label]
+            text += f"[{label}] 偵測數量: {len(dets)}, 差異: {sum(flags)}\n"
+            for i, det in enumerate(dets):
+                x1, y1, x2, y2, conf, cls_name = det[:6]
+                mark = " *" if flags[i] else ""
+                text += f"  {i+1}. {cls_name} {conf:.2f} [{int(x1)}, {int(y1)}, {int(x2)}, {int(y2)}]{mark}\n"
+            text += "\n"
+
+        self.details_text.setText(text)
+
+    def on_export_clicked(self):
+        if not self.current_results:
+            self.details_text.setText("請先執行推論或開啟歷史結果。")
+            return
+        if not self.export_images_check.isChecked() and not self.export_labels_check.isChecked():
+            self.details_text.setText("請至少選擇一種匯出內容。")
+            return
+
+        folder = QFileDialog.getExistingDirectory(self, "選擇匯出資料夾")
+        if not folder:
+            return
+
+        options = {
+            'write_images': self.export_images_check.isChecked(),
+            'write_labels': self.export_labels_check.isChecked(),
+            'jpeg_quality': self.jpeg_quality_spin.value(),
+            'max_size': self.max_size_spin.value() or None,
+        }
+        self.export_btn.setEnabled(False)
+        self.export_progress.setValue(0)
+        self.export_requested.emit(list(self.current_results.values()), folder, options)
+
+    def export_finished(self, count, failed=0):
+        self.export_btn.setEnabled(True)
+        self.export_progress.setValue(100)
+        self.details_text.append(f"匯出完成: {count} 張" + (f"，失敗 {failed} 張 (無法讀取或寫入)" if failed else ""))
+
+    def on_eval_clicked(self):
+        label_folder = self.label_folder_edit.text()
+        if not self.current_results:
+            self.details_text.setText("請先執行推論或開啟歷史結果。")
+            return
+        if not label_folder:
+            self.details_text.setText("請選擇標籤資料夾。")
+            return
+
+        self.eval_btn.setEnabled(False)
+        self.details_text.setText("評估中...")
+        self.evaluation_requested.emit(list(self.current_results.values()), label_folder)
+
+    def show_evaluation(self, metrics):
+        self.eval_btn.setEnabled(True)
+        self.details_text.setText(
+            f"評估完成\nmAP50: {metrics['map50']:.3f}\nmAP50-95: {metrics['map']:.3f}"
+        )
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("評估結果")
+        dialog.resize(700, 500)
+        report = QTextEdit()
+        report.setReadOnly(True)
+        report.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        report.setPlainText(format_report(metrics))
+        QVBoxLayout(dialog).addWidget(report)
+        dialog.show()
@@ -2,7 +2,9 @@ from PySide6.QtWidgets import QMainWindow, QTabWidget, QMessageBox
 from ui.training_tab import TrainingTab
 from ui.inference_tab import InferenceTab
 from ui.dataset_tab import DatasetTab
-from core.worker import TrainingWorker, InferenceWorker
+from core.worker import TrainingWorker, InferenceWorker, EvaluationWorker, AutotuneWorker, ExportWorker
+from core import profiling
+import time
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -21,18 +23,35 @@ class MainWindow(QMainWindow):
         self.tabs.addTab(self.training_tab, "訓練")
         self.tabs.addTab(self.inference_tab, "推論")
 
+        # Tools menu
+        tools_menu = self.menuBar().addMenu("工具")
+        self.profile_action = tools_menu.addAction("效能分析 (輸出至 runs/traces)")
+        self.profile_action.setCheckable(True)
+        self.profile_action.setChecked(profiling.is_enabled())
+        self.profile_action.toggled.connect(profiling.enable)
+
         # Connect Signals
         self.dataset_tab.dataset_ready.connect(self.training_tab.set_dataset_paths)
         self.training_tab.train_requested.connect(self.start_training)
+        self.training_tab.autotune_requested.connect(self.start_autotune)
         self.inference_tab.inference_requested.connect(self.start_inference)
+        self.inference_tab.evaluation_requested.connect(self.start_evaluation)
+        self.inference_tab.export_requested.connect(self.start_export)
 
         self.train_worker = None
+        self.autotune_worker = None
         self.inf_worker = None
+        self.eval_worker = None
+        self.export_worker = None
 
     def start_training(self, config):
         if self.train_worker and self.train_worker.isRunning():
             QMessageBox.warning(self, "忙碌中", "訓練正在進行中。")
             return
+        if self.autotune_worker and self.autotune_worker.isRunning():
+            QMessageBox.warning(self, "忙碌中", "自動調整正在進行中。")
+            self.training_tab.train_btn.setEnabled(True)
+            return
 
         self.train_worker = TrainingWorker(config)
         self.train_worker.log_signal.connect(self.training_tab.append_log)
@@ -42,6 +61,25 @@ class MainWindow(QMainWindow):
         
         self.train_worker.start()
 
+    def start_autotune(self, config):
+        if (self.train_worker and self.train_worker.isRunning()) or \
+                (self.autotune_worker and self.autotune_worker.isRunning()):
+            QMessageBox.warning(self, "忙碌中", "訓練或自動調整正在進行中。")
+            self.training_tab.autotune_btn.setEnabled(True)
+            return
+
+        self.autotune_worker = AutotuneWorker(config)
+        self.autotune_worker.log_signal.connect(self.training_tab.append_log)
+        self.autotune_worker.result_signal.connect(self.training_tab.apply_autotune)
+        self.autotune_worker.error_signal.connect(self.on_autotune_error)
+
+        self.autotune_worker.start()
+
+    def on_autotune_error(self, err_msg):
+        self.training_tab.append_log(f"錯誤: {err_msg}")
+        self.training_tab.autotune_btn.setEnabled(True)
+        QMessageBox.critical(self, "錯誤", f"自動調整失敗: {err_msg}")
+
     def on_training_finished(self):
         self.training_tab.training_finished()
         QMessageBox.information(self, "成功", "訓練成功完成！")
@@ -51,16 +89,56 @@ class MainWindow(QMainWindow):
         self.training_tab.train_btn.setEnabled(True) # Re-enable button
         QMessageBox.critical(self, "錯誤", f"訓練失敗: {err_msg}")
 
-    def start_inference(self, model_path, image_folder, use_gray):
+    def start_inference(self, model_path, image_folder, use_gray, use_cache, compare_paths, recursive):
         if self.inf_worker and self.inf_worker.isRunning():
             return
 
-        self.inf_worker = InferenceWorker(model_path, image_folder, use_gray)
-        self.inf_worker.results_signal.connect(self.inference_tab.update_results)
+        self.inf_worker = InferenceWorker(model_path, image_folder, use_gray, use_cache, compare_paths, recursive)
+        self.inf_worker.results_signal.connect(self.on_inference_results)
         self.inf_worker.error_signal.connect(self.on_inference_error)
         
         self.inf_worker.start()
 
+    def on_inference_results(self, results):
+        # Recorded into the worker's run so concurrent runs keep separate profiles
+        with profiling.activate(self.inf_worker.profiler or profiling.current()):
+            if self.inf_worker.emitted_ns is not None:
+                profiling.record("qt_signal", self.inf_worker.emitted_ns, time.perf_counter_ns())
+            with profiling.span("qt_slot", images=len(results)):
+                self.inference_tab.update_results(results)
+            profiling.finish_run("inference", log_callback=self.inference_tab.details_text.append)
+
     def on_inference_error(self, err_msg):
         QMessageBox.critical(self, "錯誤", f"推論失敗: {err_msg}")
         self.inference_tab.run_btn.setEnabled(True)
+
+    def start_evaluation(self, results, label_folder):
+        if self.eval_worker and self.eval_worker.isRunning():
+            return
+
+        self.eval_worker = EvaluationWorker(results, label_folder)
+        self.eval_worker.log_signal.connect(self.inference_tab.details_text.append)
+        self.eval_worker.metrics_signal.connect(self.inference_tab.show_evaluation)
+        self.eval_worker.error_signal.connect(self.on_evaluation_error)
+
+        self.eval_worker.start()
+
+    def on_evaluation_error(self, err_msg):
+        QMessageBox.critical(self, "錯誤", f"評估失敗: {err_msg}")
+        self.inference_tab.eval_btn.setEnabled(True)
+
+    def start_export(self, results, output_folder, options):
+        if self.export_worker and self.export_worker.isRunning():
+            return
+
+        self.export_worker = ExportWorker(results, output_folder, options)
+        self.export_worker.log_signal.connect(self.inference_tab.details_text.append)
+        self.export_worker.progress_signal.connect(self.inference_tab.export_progress.setValue)
+        self.export_worker.finished_signal.connect(self.inference_tab.export_finished)
+        self.export_worker.error_signal.connect(self.on_export_error)
+
+        self.export_worker.start()
+
+    def on_export_error(self, err_msg):
+        QMessageBox.critical(self, "錯誤", f"匯出失敗: {err_msg}")
+        self.inference_tab.export_btn.setEnabled(True)
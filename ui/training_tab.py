@@ -2,12 +2,14 @@ import os
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
     QComboBox, QSpinBox, QFileDialog, QProgressBar, QTextEdit, QGroupBox, QFormLayout,
-    QCheckBox, QDoubleSpinBox
+    QCheckBox, QDoubleSpinBox, QTableWidget, QHeaderView
 )
 from PySide6.QtCore import Qt, Signal
+from core.yolo_engine import CPU_DISTRIBUTED
 
 class TrainingTab(QWidget):
     train_requested = Signal(dict)  # Signal to send configuration to backend
+    autotune_requested = Signal(dict)  # Signal to probe batch/workers/cache before training
 
     def __init__(self):
         super().__init__()
@@ -81,12 +83,23 @@ class TrainingTab(QWidget):
 
         # Device
         self.device_combo = QComboBox()
-        self.device_combo.addItems(["Auto", "CPU", "GPU (CUDA)", "GPU (MPS)"])
+        self.device_combo.addItems(["Auto", "CPU", CPU_DISTRIBUTED, "GPU (CUDA)", "GPU (MPS)"])
         self.device_combo.setToolTip("選擇訓練裝置")
+
+        # Processes (multi-process CPU training)
+        self.processes_spin = QSpinBox()
+        self.processes_spin.setRange(2, max(2, os.cpu_count() or 2))
+        self.processes_spin.setValue(min(4, max(2, (os.cpu_count() or 2) // 8)))
+        self.processes_spin.setPrefix("程序數: ")
+        self.processes_spin.setToolTip("多程序 CPU 訓練的程序數量，每個程序綁定各自的 CPU 核心")
+        self.processes_spin.setEnabled(False)
+        self.device_combo.currentTextChanged.connect(
+            lambda text: self.processes_spin.setEnabled(text == CPU_DISTRIBUTED)
+        )
         
         # Workers
         self.workers_spin = QSpinBox()
-        self.workers_spin.setRange(0, 32)
+        self.workers_spin.setRange(0, 256)
         self.workers_spin.setValue(8)
         self.workers_spin.setPrefix("Workers: ")
         self.workers_spin.setToolTip("資料載入執行緒數量")
@@ -105,6 +118,7 @@ class TrainingTab(QWidget):
 
         row2_layout.addWidget(QLabel("Device:"))
         row2_layout.addWidget(self.device_combo)
+        row2_layout.addWidget(self.processes_spin)
         row2_layout.addWidget(self.workers_spin)
         row2_layout.addWidget(QLabel("Opt:"))
         row2_layout.addWidget(self.optimizer_combo)
@@ -169,13 +183,66 @@ class TrainingTab(QWidget):
 
         param_layout.addRow("資料增強:", row4_layout)
 
+        # Row 5: Checkpointing
+        row5_layout = QHBoxLayout()
+
+        self.resume_check = QCheckBox("自動續訓 (Resume)")
+        self.resume_check.setChecked(True)
+        self.resume_check.setToolTip("若相同專案/模型名稱有中斷的訓練且設定與資料集未變更，從 last.pt 繼續訓練")
+
+        self.save_period_spin = QSpinBox()
+        self.save_period_spin.setRange(-1, 1000)
+        self.save_period_spin.setValue(-1)
+        self.save_period_spin.setPrefix("Save Period: ")
+        self.save_period_spin.setSpecialValueText("Save Period: 關閉")
+        self.save_period_spin.setToolTip("每隔幾個 Epoch 額外儲存一次檢查點 (含優化器狀態)，-1 為關閉")
+
+        row5_layout.addWidget(self.resume_check)
+        row5_layout.addWidget(self.save_period_spin)
+
+        param_layout.addRow("檢查點:", row5_layout)
+
+        # Row 6: Multi-stage schedule (progressive resolution)
+        stage_layout = QVBoxLayout()
+        stage_header = QHBoxLayout()
+        self.stages_check = QCheckBox("多階段訓練 (漸進解析度)")
+        self.stages_check.setToolTip("前期以較小的圖片尺寸 (及部分資料) 訓練，之後的階段從上一階段的權重以完整解析度繼續訓練")
+        self.stages_check.toggled.connect(self.on_stages_toggled)
+        self.add_stage_btn = QPushButton("新增階段")
+        self.add_stage_btn.clicked.connect(lambda: self.add_stage_row())
+        self.remove_stage_btn = QPushButton("移除階段")
+        self.remove_stage_btn.clicked.connect(self.remove_stage_row)
+        stage_header.addWidget(self.stages_check)
+        stage_header.addStretch()
+        stage_header.addWidget(self.add_stage_btn)
+        stage_header.addWidget(self.remove_stage_btn)
+
+        self.stage_table = QTableWidget(0, 3)
+        self.stage_table.setHorizontalHeaderLabels(["Epochs", "ImgSz", "資料比例"])
+        self.stage_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.stage_table.setMaximumHeight(120)
+
+        stage_layout.addLayout(stage_header)
+        stage_layout.addWidget(self.stage_table)
+        param_layout.addRow("訓練階段:", stage_layout)
+        self.on_stages_toggled(False)
+
         param_group.setLayout(param_layout)
         layout.addWidget(param_group)
 
         # Controls & Logs
+        btn_layout = QHBoxLayout()
+        self.autotune_btn = QPushButton("自動調整 Batch/Workers")
+        self.autotune_btn.setMinimumHeight(40)
+        self.autotune_btn.setToolTip("以目前資料集實測不同 Batch、Workers 與 Cache 設定的速度，自動套用最快且記憶體足夠的組合")
+        self.autotune_btn.clicked.connect(self.on_autotune_clicked)
+
         self.train_btn = QPushButton("開始訓練")
         self.train_btn.setMinimumHeight(40)
         self.train_btn.clicked.connect(self.on_train_clicked)
+
+        btn_layout.addWidget(self.autotune_btn)
+        btn_layout.addWidget(self.train_btn, 1)
         
         self.progress_bar = QProgressBar()
         self.progress_bar.setValue(0)
@@ -183,7 +250,7 @@ class TrainingTab(QWidget):
         self.log_output = QTextEdit()
         self.log_output.setReadOnly(True)
 
-        layout.addWidget(self.train_btn)
+        layout.addLayout(btn_layout)
         layout.addWidget(self.progress_bar)
         layout.addWidget(self.log_output)
 
@@ -207,8 +274,8 @@ class TrainingTab(QWidget):
         if folder:
             line_edit.setText(folder)
 
-    def on_train_clicked(self):
-        config = {
+    def get_config(self):
+        return {
             "project_name": self.project_name_edit.text(),
             "model_name": self.model_name_edit.text(),
             "version": self.version_combo.currentText(),
@@ -221,6 +288,7 @@ class TrainingTab(QWidget):
             "batch": self.batch_spin.value(),
             "imgsz": self.imgsz_spin.value(),
             "device": self.device_combo.currentText(),
+            "processes": self.processes_spin.value(),
             "workers": self.workers_spin.value(),
             "optimizer": self.optimizer_combo.currentText(),
             "patience": self.patience_spin.value(),
@@ -230,12 +298,87 @@ class TrainingTab(QWidget):
             "cache": self.cache_check.isChecked(),
             "degrees": self.degrees_spin.value(),
             "fliplr": self.fliplr_spin.value(),
-            "mosaic": self.mosaic_spin.value()
+            "mosaic": self.mosaic_spin.value(),
+            "resume": self.resume_check.isChecked(),
+            "save_period": self.save_period_spin.value(),
+            "stages": self.get_stages()
         }
+
+    def on_stages_toggled(self, enabled):
+        if enabled and self.stage_table.rowCount() == 0:
+            # Default schedule: first half at half resolution, then full resolution
+            epochs, imgsz = self.epochs_spin.value(), self.imgsz_spin.value()
+            first = max(1, epochs // 2)
+            self.add_stage_row(first, max(32, imgsz // 2 // 32 * 32))
+            self.add_stage_row(max(1, epochs - first), imgsz)
+        self.stage_table.setEnabled(enabled)
+        self.add_stage_btn.setEnabled(enabled)
+        self.remove_stage_btn.setEnabled(enabled)
+        # Total epochs and final size come from the stages
+        self.epochs_spin.setEnabled(not enabled)
+        self.imgsz_spin.setEnabled(not enabled)
+
+    def add_stage_row(self, epochs=None, imgsz=None, fraction=1.0):
+        row = self.stage_table.rowCount()
+        self.stage_table.insertRow(row)
+
+        epochs_spin = QSpinBox()
+        epochs_spin.setRange(1, 10000)
+        epochs_spin.setValue(epochs or 10)
+        imgsz_spin = QSpinBox()
+        imgsz_spin.setRange(32, 2048)
+        imgsz_spin.setSingleStep(32)
+        imgsz_spin.setValue(imgsz or self.imgsz_spin.value())
+        fraction_spin = QDoubleSpinBox()
+        fraction_spin.setRange(0.01, 1.0)
+        fraction_spin.setSingleStep(0.1)
+        fraction_spin.setValue(fraction)
+
+        self.stage_table.setCellWidget(row, 0, epochs_spin)
+        self.stage_table.setCellWidget(row, 1, imgsz_spin)
+        self.stage_table.setCellWidget(row, 2, fraction_spin)
+
+    def remove_stage_row(self):
+        row = self.stage_table.currentRow()
+        self.stage_table.removeRow(row if row >= 0 else self.stage_table.rowCount() - 1)
+
+    def get_stages(self):
+        if not self.stages_check.isChecked():
+            return []
+        return [
+            {
+                "epochs": self.stage_table.cellWidget(row, 0).value(),
+                "imgsz": self.stage_table.cellWidget(row, 1).value(),
+                "fraction": self.stage_table.cellWidget(row, 2).value(),
+            }
+            for row in range(self.stage_table.rowCount())
+        ]
+
+    def on_train_clicked(self):
+        config = self.get_config()
         self.train_requested.emit(config)
         self.log_output.append("請求訓練中...")
         self.train_btn.setEnabled(False)
 
+    def on_autotune_clicked(self):
+        config = self.get_config()
+        if not config["train_images"]:
+            self.append_log("請先選擇訓練圖片路徑。")
+            return
+        self.autotune_requested.emit(config)
+        self.append_log("自動調整中，正在實測不同設定...")
+        self.autotune_btn.setEnabled(False)
+
+    def apply_autotune(self, result):
+        self.autotune_btn.setEnabled(True)
+        self.batch_spin.setValue(result['batch'])
+        self.workers_spin.setValue(result['workers'])
+        self.cache_check.setChecked(bool(result['cache']))
+        self.append_log(
+            f"已套用自動調整結果: Batch {result['batch']}, Workers {result['workers']}, "
+            f"Cache {'開啟' if result['cache'] else '關閉'}"
+        )
+
     def append_log(self, message):
         self.log_output.append(message)
         # Auto scroll